@@ -1,19 +1,35 @@
 from flask import Blueprint, request, jsonify, render_template, send_file
+from flask_caching import Cache
 from werkzeug.utils import secure_filename
 import shutil
 import json
+import queue
 import threading
 from pathlib import Path 
-from config import load_config, save_config, PATH_ANILOADER_TXT_BAK
-from database import connect, add_url_to_db
+from config import load_config, save_config, PATH_ANILOADER_TXT_BAK, DATA_DIR
+from database import get_connection, close_thread_connection, add_url_to_db, add_urls_to_db, parse_missing_episodes, set_deleted_status, anime_search_condition
 from helper import sanitize_url
 from txt_manager import write_to_aniloader_txt_bak
-from downloader import download
+from downloader import download, request_stop, clear_stop_request
 import time
         
 # Blueprint erstellen
 api = Blueprint('api', __name__)
 
+# Cache für lesende DB-Endpoints (wird in main.py an die App gebunden)
+cache = Cache()
+
+def _is_success_response(response) -> bool:
+    """response_filter für cache.cached: nur erfolgreiche Antworten cachen, Fehler nicht für die ganze Timeout-Dauer ausliefern."""
+    if isinstance(response, tuple):
+        return len(response) < 2 or response[1] == 200
+    return getattr(response, 'status_code', 200) == 200
+
+@api.teardown_app_request
+def close_db_connection(exception=None):
+    """Schließt die Thread-Verbindung nach jedem Request; der Server startet pro Request einen eigenen Thread."""
+    close_thread_connection()
+
 # Globaler Status für Downloads
 download_status = {
     'status': 'idle',
@@ -50,13 +66,13 @@ def upload_txt():
         content = file.read().decode('utf-8')
         lines = [line.strip() for line in content.split('\n') if line.strip()]
         
-        added = 0
-        for line in lines:
-            if line.startswith('http'):
-                clean_line = sanitize_url(line)
-                write_to_aniloader_txt_bak(PATH_ANILOADER_TXT_BAK, [clean_line])
-                add_url_to_db(clean_line)
-                added += 1
+        clean_lines = [sanitize_url(line) for line in lines if line.startswith('http')]
+        # Alle URLs in einer Transaktion einfügen (Titel parallel abrufen) statt je Zeile zu committen
+        added = add_urls_to_db(clean_lines)
+        # Backup einmal für alle URLs aktualisieren statt pro Zeile die ganze Datei zu lesen
+        if clean_lines:
+            write_to_aniloader_txt_bak(PATH_ANILOADER_TXT_BAK, clean_lines)
+        cache.clear()
         
         return jsonify({'status': 'ok', 'msg': f'{added} URLs hinzugefügt', 'count': added}), 200
     except Exception as e:
@@ -78,23 +94,21 @@ def start_download():
             data = request.get_json() or {}
             mode = data.get('mode', 'default')
             
-            if download_status['status'] == 'running':
+            # Auch während des Stoppens blockieren: der alte Thread beendet noch seine aktuelle Episode
+            if download_status['status'] in ('running', 'stopped'):
                 return jsonify({'status': 'error', 'msg': 'Download läuft bereits'}), 400
         
 
             def run_download():
-                global download_status
-                download_status['status'] = 'running'
-                download_status['mode'] = mode
-                download_status['started_at'] = time.time()
                 try:
-                    download(mode)
+                    download(mode, status=download_status)
                 finally:
-                    download_status['status'] = 'idle'
-                    download_status['mode'] = None
-                    download_status['current_id'] = None
-                    download_status['current_title'] = None
+                    download_status.update(status='idle', mode=None, current_id=None, current_title=None)
             
+            # Status noch unter dem Lock setzen, damit ein zweiter Start-Request ihn schon sieht
+            download_status.update(status='running', mode=mode, started_at=time.time(), current_id=None, current_title=None)
+            # Vor dem Thread-Start zurücksetzen: ein /stop direkt nach dem Start darf nicht mehr verloren gehen
+            clear_stop_request()
             download_thread = threading.Thread(target=run_download, daemon=True)
             download_thread.start()
             
@@ -119,6 +133,7 @@ def stop_download():
     global download_status
     if download_status['status'] == 'running':
         download_status['status'] = 'stopped'
+        request_stop()
         return jsonify({'status': 'ok', 'msg': 'Download wird gestoppt'}), 200
     return jsonify({'status': 'ok', 'msg': 'Kein Download aktiv'}), 200
 
@@ -147,24 +162,50 @@ def config():
         try:
             data = request.get_json()
             if save_config(data):
+                # Gecachte Antworten können vom alten Datenbank- bzw. Download-Pfad stammen
+                cache.clear()
                 return jsonify({'status': 'ok', 'msg': 'Konfiguration gespeichert', 'config': data}), 200
             return jsonify({'status': 'error', 'msg': 'Speichern fehlgeschlagen'}), 500
         except Exception as e:
             return jsonify({'status': 'error', 'msg': str(e)}), 500
 
 
+# Tk ist an den Thread gebunden, der das Root-Fenster erzeugt hat: ein eigener Thread hält ein
+# verstecktes Root-Fenster über alle Aufrufe hinweg und öffnet die Dialoge nacheinander
+_folder_dialog_requests = queue.Queue()
+_folder_dialog_thread = None
+_folder_dialog_lock = threading.Lock()
+
+def _folder_dialog_worker():
+    root = None
+    while True:
+        reply = _folder_dialog_requests.get()
+        try:
+            from tkinter import Tk, filedialog
+            if root is None:
+                root = Tk()
+                root.withdraw()
+                root.attributes('-topmost', True)
+            reply.put((filedialog.askdirectory(parent=root), None))
+        except Exception as e:
+            reply.put((None, e))
+
 @api.route("/pick_folder", methods=["GET"])
 def pick_folder():
     """
     Öffnet einen Ordner-Auswahl-Dialog (tkinter).
     """
+    global _folder_dialog_thread
     try:
-        from tkinter import Tk, filedialog
-        root = Tk()
-        root.withdraw()
-        root.attributes('-topmost', True)
-        folder = filedialog.askdirectory()
-        root.destroy()
+        with _folder_dialog_lock:
+            if _folder_dialog_thread is None:
+                _folder_dialog_thread = threading.Thread(target=_folder_dialog_worker, daemon=True)
+                _folder_dialog_thread.start()
+        reply = queue.Queue(maxsize=1)
+        _folder_dialog_requests.put(reply)
+        folder, error = reply.get()
+        if error is not None:
+            raise error
         if folder:
             return jsonify({'status': 'ok', 'selected': folder}), 200
         return jsonify({'status': 'canceled'}), 200
@@ -175,6 +216,7 @@ def pick_folder():
 
 # -------------------- SYSTEM INFO --------------------
 @api.route('/disk')
+@cache.cached(timeout=30, response_filter=_is_success_response)
 def disk():
     """
     Gibt Informationen über den verfügbaren Speicherplatz zurück.
@@ -191,25 +233,46 @@ def disk():
         return jsonify({'status': 'error', 'msg': str(e), 'free_gb': None}), 500
 
 
+def _read_last_lines(file_path: Path, count: int, block_size: int = 65536) -> list[str]:
+    """Liest nur die letzten `count` Zeilen, indem die Datei blockweise vom Ende her gelesen wird."""
+    with open(file_path, 'rb') as f:
+        f.seek(0, 2)
+        position = f.tell()
+        blocks = []
+        newlines = 0
+        # Eine Zeile mehr zählen, damit die erste zurückgegebene Zeile vollständig ist
+        while position > 0 and newlines <= count:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            block = f.read(read_size)
+            blocks.append(block)
+            newlines += block.count(b'\n')
+    lines = b''.join(reversed(blocks)).decode('utf-8', errors='replace').splitlines()
+    return lines[-count:]
+
+
 @api.route("/last_run")
 def last_run():
     """
     Gibt die Logs vom letzten Download-Run zurück.
+    Mit ?tail=N nur die letzten N Zeilen (die Datei wird dann nur vom Ende her gelesen).
     """
     try:
-        config =load_config()
-        if not config:
-            return jsonify({'status': 'error', 'msg': 'Config konnte nicht geladen werden'}), 500
-        data_dir = Path(config.get('data_dir'))
-        
-        log_file = Path(data_dir / 'last_run.txt')
+        # Gleicher Pfad, in den logger.py den Run schreibt
+        log_file = DATA_DIR / 'last_run.txt'
         if not log_file.exists():
             return jsonify([]), 200
         
+        tail = request.args.get('tail', type=int)
+        if tail is not None and tail > 0:
+            return jsonify([line.strip() for line in _read_last_lines(log_file, tail)]), 200
+        
+        # Zeilenweise lesen statt readlines(), damit die Datei nicht zusätzlich als Ganzes im Speicher liegt
         with open(log_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
+            lines = [line.strip() for line in f]
         
-        return jsonify([line.strip() for line in lines]), 200
+        return jsonify(lines), 200
     except Exception as e:
         return jsonify({'status': 'error', 'msg': str(e)}), 500
 
@@ -217,14 +280,12 @@ def last_run():
 # -------------------- DATABASE --------------------
 @api.route("/database")
 @api.route("/overview")
+@cache.cached(timeout=5, query_string=True, response_filter=_is_success_response)
 def database():
     """
     Gibt alle Datenbank-Einträge zurück.
     """
     try:
-        db = connect()
-        cursor = db.cursor()
-        
         q = request.args.get('q', '').strip()
         complete = request.args.get('complete', '').strip()
         deutsch = request.args.get('deutsch', '').strip()
@@ -240,8 +301,9 @@ def database():
         params = []
         
         if q:
-            query += " AND (title LIKE ? OR url LIKE ?)"
-            params.extend([f'%{q}%', f'%{q}%'])
+            search_condition, search_params = anime_search_condition(q)
+            query += f" AND {search_condition}"
+            params.extend(search_params)
         
         if complete == '1':
             query += " AND complete = 1"
@@ -257,6 +319,8 @@ def database():
         
         query += f" ORDER BY {sort_by} {order}"
         
+        db = get_connection()
+        cursor = db.cursor()
         cursor.execute(query, params)
         rows = cursor.fetchall()
         columns = [desc[0] for desc in cursor.description]
@@ -265,39 +329,37 @@ def database():
         for row in rows:
             item = dict(zip(columns, row))
             try:
-                item['fehlende'] = eval(item.get('fehlende_deutsch_folgen', '[]'))
+                # Standardwert '[]' (fast alle Zeilen) wird in parse_missing_episodes nicht erst geparst
+                item['fehlende'] = parse_missing_episodes(item.get('fehlende_deutsch_folgen'))
             except Exception:
                 item['fehlende'] = []
             result.append(item)
         
-        db.close()
         return jsonify(result), 200
     except Exception as e:
         return jsonify({'status': 'error', 'msg': str(e)}), 500
 
 
 @api.route("/counts")
+@cache.cached(timeout=5, response_filter=_is_success_response)
 def counts():
     """
     Gibt verschiedene Statistiken zurück.
     """
     try:
-        db = connect()
+        db = get_connection()
         cursor = db.cursor()
+            
+        # Alle Zähler in einem Tabellendurchlauf statt vier einzelnen COUNT-Abfragen
+        cursor.execute("""
+            SELECT COUNT(*),
+                   COALESCE(SUM(complete = 1), 0),
+                   COALESCE(SUM(deutsch_komplett = 1), 0),
+                   COALESCE(SUM(deleted = 1), 0)
+            FROM anime
+        """)
+        total, complete, deutsch, deleted = cursor.fetchone()
         
-        cursor.execute("SELECT COUNT(*) FROM anime")
-        total = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM anime WHERE complete = 1")
-        complete = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM anime WHERE deutsch_komplett = 1")
-        deutsch = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM anime WHERE deleted = 1")
-        deleted = cursor.fetchone()[0]
-        
-        db.close()
         return jsonify({
             'total': total,
             'complete': complete,
@@ -321,13 +383,12 @@ def export():
             return jsonify({'status': 'error', 'msg': 'Config konnte nicht geladen werden'}), 500
         data_dir = Path(config.get('data_dir'))
         
-        db = connect()
+        db = get_connection()
         cursor = db.cursor()
         cursor.execute("SELECT * FROM anime")
         rows = cursor.fetchall()
         columns = [desc[0] for desc in cursor.description]
         result = [dict(zip(columns, row)) for row in rows]
-        db.close()
         
         export_file = Path(data_dir / 'AniLoader_DB_export.json')
         with open(export_file, 'w', encoding='utf-8') as f:
@@ -357,6 +418,7 @@ def add_link():
         
         clean_url = sanitize_url(url)
         add_url_to_db(clean_url)
+        cache.clear()
         
         return jsonify({'status': 'ok', 'msg': 'URL erfolgreich hinzugefügt'}), 200
     except Exception as e:
@@ -396,11 +458,8 @@ def delete_anime():
         if not anime_id:
             return jsonify({'status': 'error', 'msg': 'Keine ID angegeben'}), 400
         
-        db = connect()
-        cursor = db.cursor()
-        cursor.execute("UPDATE anime SET deleted = 1 WHERE id = ?", (anime_id,))
-        db.commit()
-        db.close()
+        set_deleted_status(anime_id, True)
+        cache.clear()
         
         return jsonify({'status': 'ok', 'msg': 'Anime als gelöscht markiert'}), 200
     except Exception as e:
@@ -419,11 +478,8 @@ def restore_anime():
         if not anime_id:
             return jsonify({'status': 'error', 'msg': 'Keine ID angegeben'}), 400
         
-        db = connect()
-        cursor = db.cursor()
-        cursor.execute("UPDATE anime SET deleted = 0 WHERE id = ?", (anime_id,))
-        db.commit()
-        db.close()
+        set_deleted_status(anime_id, False)
+        cache.clear()
         
         return jsonify({'status': 'ok', 'msg': 'Anime wiederhergestellt'}), 200
     except Exception as e:
@@ -1,6 +1,11 @@
 from pathlib import Path
 import os
+import copy
 import json
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / "data"
@@ -36,6 +41,26 @@ standart_werte = {
 }
 
 
+# Geparste config.json, gültig solange sich mtime/Größe der Datei nicht ändern
+_config_cache = {"stat": None, "config": None}
+
+
+def _read_config_file() -> dict:
+    if orjson is not None:
+        with open(CONFIG_PATH, 'rb') as config_file:
+            return orjson.loads(config_file.read())
+    with open(CONFIG_PATH, 'r', encoding='utf-8') as config_file:
+        return json.load(config_file)
+
+
+def _config_stat():
+    try:
+        stat = CONFIG_PATH.stat()
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
 def ceck_and_init_config() -> bool:
     """
     Prüft, ob alle benötigten Schlüssel in config_json vorhanden sind und ergänzt fehlende mit Standardwerten.
@@ -55,8 +80,7 @@ def ceck_and_init_config() -> bool:
         complete = False
     
     try:
-        with open(CONFIG_PATH, 'r', encoding='utf-8') as config_file:
-            config_json = json.load(config_file)
+        config_json = _read_config_file()
         for variable, wert in standart_werte.items():
             if variable not in config_json:
                 config_json[variable] = wert
@@ -74,72 +98,82 @@ def ceck_and_init_config() -> bool:
     return complete
 
 def load_config():
+    config_stat = _config_stat()
+    if config_stat is not None and config_stat == _config_cache["stat"]:
+        return copy.deepcopy(_config_cache["config"])
     if ceck_and_init_config() == False:
         print("[CONFIG-ERROR] config.json ist ungültig oder unvollständig und konnte nicht automatisch korrigiert werden.")
         return False
+    config_json = None
     try:
         if CONFIG_PATH.exists():
-            with open(CONFIG_PATH, 'r', encoding='utf-8') as config_file:
-                config_json = json.load(config_file)
-
-                if not isinstance(config_json.get('data_folder_path'), str):
-                    raise Exception("Ungültiger Wert für 'data_folder_path'. Erwartet wird ein String.")
-                
-                if not isinstance(config_json.get('languages'), list) :
-                    raise Exception("Ungültiger Wert für 'languages'. Erwartet wird eine Liste von Strings.")
-
-                if not isinstance(config_json.get('min_free_gb'), (int, float)):
-                    raise Exception("Ungültiger Wert für 'min_free_gb'. Erwartet wird eine Zahl.")
-
-
-                autostart_mode = config_json.get('autostart_mode')
-                allowed_modes = {None, 'default', 'german', 'new', 'check-missing'}
-                falsy_values = {'', 'none', 'off', 'disabled', 'false', 'null'}
-                
-                if autostart_mode is None or autostart_mode in allowed_modes:
-                    # Valid: None or one of the allowed modes
-                    pass
-                elif isinstance(autostart_mode, str) and autostart_mode.strip().lower() in falsy_values:
-                    # Valid: falsy string value
-                    pass
-                else:
-                    raise Exception(f"Ungültiger Wert für 'autostart_mode'. Erwartet wird einer der folgenden Werte: {allowed_modes} oder eine falsy Angabe wie '', 'none', 'off', 'disabled', 'false', 'null'.")
-
-                if not isinstance(str(config_json.get('download_path')).strip(), str):
-                    raise Exception("Ungültiger Wert für 'download_path'. Erwartet wird ein String.")                
-
-                if str(config_json.get('storage_mode')).strip().lower() not in ['standard', 'separate']:
-                    raise Exception("Ungültiger Wert für 'storage_mode'. Erwartet wird 'standard' oder 'separate'.")
-                
-                if not isinstance(config_json.get('movies_path'), str):
-                    raise Exception("Ungültiger Wert für 'movies_path'. Erwartet wird ein String.")
-                if not isinstance(config_json.get('series_path'), str):
-                    raise Exception("Ungültiger Wert für 'series_path'. Erwartet wird ein String.")   
-                if not isinstance(config_json.get('anime_path'), str):
-                    raise Exception("Ungültiger Wert für 'anime_path'. Erwartet wird ein String.")
-                if not isinstance(config_json.get('anime_separate_movies'), bool):
-                    raise Exception("Ungültiger Wert für 'anime_separate_movies'. Erwartet wird ein Boolean.")
-                if not isinstance(config_json.get('serien_separate_movies'), bool):
-                    raise Exception("Ungültiger Wert für 'serien_separate_movies'. Erwartet wird ein Boolean.")
-                if not isinstance(config_json.get('anime_movies_path'), str):
-                    raise Exception("Ungültiger Wert für 'anime_movies_path'. Erwartet wird ein String.")
-                if not isinstance(config_json.get('serien_movies_path'), str):
-                    raise Exception("Ungültiger Wert für 'serien_movies_path'. Erwartet wird ein String.")
-
-                if not isinstance(config_json.get('port'), int) or not (1 <= config_json.get('port') <= 65535):
-                    raise Exception("Ungültiger Wert für 'port'. Erwartet wird eine Ganzzahl zwischen 1 und 65535.")
-
-                if not isinstance(config_json.get('refresh_titles'), bool):
-                    raise Exception("Ungültiger Wert für 'refresh_titles'. Erwartet wird ein Boolean.")
+            # stat vor dem Lesen, damit eine parallele Änderung den Cache nicht mit altem Inhalt belegt
+            config_stat = _config_stat()
+            config_json = _read_config_file()
+
+            if not isinstance(config_json.get('data_folder_path'), str):
+                raise Exception("Ungültiger Wert für 'data_folder_path'. Erwartet wird ein String.")
+            
+            if not isinstance(config_json.get('languages'), list) :
+                raise Exception("Ungültiger Wert für 'languages'. Erwartet wird eine Liste von Strings.")
+
+            if not isinstance(config_json.get('min_free_gb'), (int, float)):
+                raise Exception("Ungültiger Wert für 'min_free_gb'. Erwartet wird eine Zahl.")
+
+
+            autostart_mode = config_json.get('autostart_mode')
+            allowed_modes = {None, 'default', 'german', 'new', 'check-missing'}
+            falsy_values = {'', 'none', 'off', 'disabled', 'false', 'null'}
+            
+            if autostart_mode is None or autostart_mode in allowed_modes:
+                # Valid: None or one of the allowed modes
+                pass
+            elif isinstance(autostart_mode, str) and autostart_mode.strip().lower() in falsy_values:
+                # Valid: falsy string value
+                pass
+            else:
+                raise Exception(f"Ungültiger Wert für 'autostart_mode'. Erwartet wird einer der folgenden Werte: {allowed_modes} oder eine falsy Angabe wie '', 'none', 'off', 'disabled', 'false', 'null'.")
+
+            if not isinstance(str(config_json.get('download_path')).strip(), str):
+                raise Exception("Ungültiger Wert für 'download_path'. Erwartet wird ein String.")                
+
+            if str(config_json.get('storage_mode')).strip().lower() not in ['standard', 'separate']:
+                raise Exception("Ungültiger Wert für 'storage_mode'. Erwartet wird 'standard' oder 'separate'.")
+            
+            if not isinstance(config_json.get('movies_path'), str):
+                raise Exception("Ungültiger Wert für 'movies_path'. Erwartet wird ein String.")
+            if not isinstance(config_json.get('series_path'), str):
+                raise Exception("Ungültiger Wert für 'series_path'. Erwartet wird ein String.")   
+            if not isinstance(config_json.get('anime_path'), str):
+                raise Exception("Ungültiger Wert für 'anime_path'. Erwartet wird ein String.")
+            if not isinstance(config_json.get('anime_separate_movies'), bool):
+                raise Exception("Ungültiger Wert für 'anime_separate_movies'. Erwartet wird ein Boolean.")
+            if not isinstance(config_json.get('serien_separate_movies'), bool):
+                raise Exception("Ungültiger Wert für 'serien_separate_movies'. Erwartet wird ein Boolean.")
+            if not isinstance(config_json.get('anime_movies_path'), str):
+                raise Exception("Ungültiger Wert für 'anime_movies_path'. Erwartet wird ein String.")
+            if not isinstance(config_json.get('serien_movies_path'), str):
+                raise Exception("Ungültiger Wert für 'serien_movies_path'. Erwartet wird ein String.")
+
+            if not isinstance(config_json.get('port'), int) or not (1 <= config_json.get('port') <= 65535):
+                raise Exception("Ungültiger Wert für 'port'. Erwartet wird eine Ganzzahl zwischen 1 und 65535.")
+
+            if not isinstance(config_json.get('refresh_titles'), bool):
+                raise Exception("Ungültiger Wert für 'refresh_titles'. Erwartet wird ein Boolean.")
 
     except Exception as exception:
         print(f"[CONFIG-ERROR] load_config (validation): {exception}")
         return False
 
-    try:        
-        with open(CONFIG_PATH, 'r', encoding='utf-8') as config_file:
-            config_json = json.load(config_file)
-            return config_json
+    if config_json is None:
+        print("[CONFIG-ERROR] load_config: config.json nicht gefunden.")
+        return False
+
+    try:
+        # Bereits validierte Daten übernehmen statt die Datei erneut zu lesen und zu parsen
+        _config_cache["stat"] = config_stat
+        _config_cache["config"] = copy.deepcopy(config_json)
+        return config_json
     except Exception as exception:
         print(f"[CONFIG-ERROR] load_config (print): {exception}")
         return False
@@ -150,6 +184,7 @@ def save_config(config_json: dict) -> bool:
         with open(tmp_path, 'w', encoding='utf-8') as f:
             json.dump(config_json, f, indent=2, ensure_ascii=False)
         os.replace(tmp_path, CONFIG_PATH)
+        _config_cache["stat"] = None
         print("[CONFIG] gespeichert")
         return True
     except Exception as exception:
@@ -1,8 +1,26 @@
 import sqlite3
+import threading
+import atexit
+import ast
+import json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from config import load_config
 from html_request import get_series_title
 
+TITLE_FETCH_WORKERS = 16
+
+# Eine Verbindung pro Thread (v.a. Download-Thread), statt pro Aufruf neu zu verbinden.
+# Die Thread-lokale Referenz ist die einzige: endet der Thread, wird die Verbindung freigegeben und geschlossen.
+_thread_local = threading.local()
+# Serialisiert Schreibzugriffe aller Threads, damit sie nicht erst im busy_timeout auf die SQLite-Sperre warten
+_write_lock = threading.RLock()
+# Schreibende Helfer nutzen "with _write_lock, database:": commit bei Erfolg, rollback bei einer Exception
+
 def get_db_path():
     try:
         config_data = load_config()
@@ -15,14 +33,130 @@ def get_db_path():
         print(f"[CONFIG-ERROR] database.py: {e}")
     return db_path
 
-def connect() -> sqlite3.Connection:
-    return sqlite3.connect(get_db_path())
+def _open_connection(db_path) -> sqlite3.Connection:
+    """Öffnet eine Verbindung und setzt die verbindungsbezogenen PRAGMAs."""
+    database = sqlite3.connect(db_path)
+    database.execute("PRAGMA busy_timeout=5000")
+    database.execute("PRAGMA synchronous=NORMAL")
+    database.execute("PRAGMA temp_store=MEMORY")
+    database.execute("PRAGMA cache_size=-20000")
+    database.execute("PRAGMA mmap_size=268435456")
+    return database
+
+def dump_missing_episodes(fehlende_folgen: list) -> str:
+    """Serialisiert die Liste fehlender deutscher Episoden als JSON für fehlende_deutsch_folgen."""
+    return json.dumps(fehlende_folgen, ensure_ascii=False)
+
+def parse_missing_episodes(raw: str | None) -> list:
+    """
+    Liest fehlende_deutsch_folgen. Neue Einträge sind JSON (orjson, falls installiert);
+    ältere Einträge wurden als Python-Liste (str(list)) gespeichert und werden per literal_eval gelesen.
+    """
+    if not raw or raw == '[]':
+        return []
+    try:
+        return orjson.loads(raw) if orjson is not None else json.loads(raw)
+    except ValueError:
+        return ast.literal_eval(raw)
+
+def get_connection() -> sqlite3.Connection:
+    """
+    Gibt die wiederverwendete Verbindung des aktuellen Threads zurück (nicht schließen).
+    Ändert sich der Datenbankpfad, wird eine neue Verbindung geöffnet.
+    In Request-Threads schließt der teardown-Hook der API die Verbindung nach jedem Request.
+    """
+    db_path = get_db_path()
+    database = getattr(_thread_local, "database", None)
+    if database is not None and _thread_local.db_path != db_path:
+        database.close()
+        database = None
+    if database is None:
+        database = _open_connection(db_path)
+        _thread_local.database = database
+        _thread_local.db_path = db_path
+    elif database.in_transaction:
+        # Nicht stillschweigend verwerfen: der Aufrufer mit der offenen Transaktion muss selbst committen oder zurückrollen
+        print("[DB-ERROR] get_connection: Verbindung des Threads hat noch eine offene Transaktion.")
+    return database
+
+def close_thread_connection() -> None:
+    """Schließt die Verbindung des aktuellen Threads (nach jedem Request und beim Beenden für den Hauptthread), damit WAL sauber zurückgeschrieben wird."""
+    database = getattr(_thread_local, "database", None)
+    if database is None:
+        return
+    _thread_local.database = None
+    try:
+        database.close()
+    except sqlite3.Error as exception:
+        print(f"[DB-ERROR] close_thread_connection: {exception}")
+
+atexit.register(close_thread_connection)
+
+def _create_anime_indexes(cursor: sqlite3.Cursor) -> None:
+    """Legt die Indizes der anime-Tabelle an."""
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_anime_complete ON anime(complete) WHERE complete = 1")
+    # Download-Modi und /database filtern auf deleted + complete bzw. deutsch_komplett der aktiven Serien
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_anime_deleted_complete ON anime(deleted, complete)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_anime_deutsch ON anime(deutsch_komplett) WHERE deleted = 0")
+
+# Volltextindex für die Titel-/URL-Suche; False, wenn SQLite ohne FTS5 (trigram) gebaut ist
+_fts_enabled = False
+# Trigram-Suche braucht mindestens 3 Zeichen, kürzere Suchbegriffe laufen über LIKE
+FTS_MIN_QUERY_LENGTH = 3
+
+def _setup_anime_fts(cursor: sqlite3.Cursor) -> bool:
+    """
+    Legt den FTS5-Index (trigram, damit Teilstrings wie bei LIKE gefunden werden) und die Trigger an,
+    die ihn mit der anime-Tabelle synchron halten. Gibt False zurück, wenn FTS5 nicht verfügbar ist.
+    """
+    try:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'anime_fts'")
+        created = cursor.fetchone() is None
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS anime_fts
+            USING fts5(title, url, content='anime', content_rowid='id', tokenize='trigram')
+        """)
+    except sqlite3.OperationalError as exception:
+        print(f"[DB] FTS5 nicht verfügbar, Suche nutzt LIKE: {exception}")
+        return False
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS anime_fts_insert AFTER INSERT ON anime BEGIN
+            INSERT INTO anime_fts(rowid, title, url) VALUES (new.id, new.title, new.url);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS anime_fts_delete AFTER DELETE ON anime BEGIN
+            INSERT INTO anime_fts(anime_fts, rowid, title, url) VALUES ('delete', old.id, old.title, old.url);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS anime_fts_update AFTER UPDATE OF title, url ON anime BEGIN
+            INSERT INTO anime_fts(anime_fts, rowid, title, url) VALUES ('delete', old.id, old.title, old.url);
+            INSERT INTO anime_fts(rowid, title, url) VALUES (new.id, new.title, new.url);
+        END
+    """)
+    if created:
+        cursor.execute("INSERT INTO anime_fts(anime_fts) VALUES ('rebuild')")
+    return True
+
+def anime_search_condition(query: str) -> tuple[str, list]:
+    """SQL-Bedingung und Parameter für die Suche in Titel und URL (FTS5-Index, sonst LIKE)."""
+    if _fts_enabled and len(query) >= FTS_MIN_QUERY_LENGTH:
+        # Als Phrase suchen, damit Sonderzeichen im Suchbegriff keine FTS-Syntax bilden
+        phrase = '"' + query.replace('"', '""') + '"'
+        return "id IN (SELECT rowid FROM anime_fts WHERE anime_fts MATCH ?)", [phrase]
+    return "(title LIKE ? OR url LIKE ?)", [f'%{query}%', f'%{query}%']
 
 def init_db() -> None:
-    """Erstellt/migriert die Tabellen und reindiziert anime-IDs sequentiell."""
-    database = connect()
+    """Erstellt/migriert die Tabellen; bestehende anime-IDs bleiben unverändert."""
+    database = get_connection()
     cursor = database.cursor()
 
+    # WAL bleibt in der DB-Datei gespeichert, muss also nur einmal gesetzt werden
+    if str(get_db_path()) != ":memory:":
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA wal_autocheckpoint=1000")
+
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS anime (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -55,11 +189,14 @@ def init_db() -> None:
         if "position" not in cols:
             cursor.execute("ALTER TABLE queue ADD COLUMN position INTEGER")
             cursor.execute("SELECT id FROM queue ORDER BY added_at ASC, id ASC")
-            for idx, (qid,) in enumerate(cursor.fetchall(), start=1):
-                cursor.execute("UPDATE queue SET position = ? WHERE id = ?", (idx, qid))
+            cursor.executemany(
+                "UPDATE queue SET position = ? WHERE id = ?",
+                [(idx, qid) for idx, (qid,) in enumerate(cursor.fetchall(), start=1)],
+            )
             database.commit()
             print("[DB] queue.position Spalte hinzugefügt und initialisiert")
     except Exception as exception:
+        database.rollback()
         print(f"[DB-ERROR] Migration queue.position: {exception}")
 
     # Migration: folder_name-Spalte in anime
@@ -71,240 +208,228 @@ def init_db() -> None:
             database.commit()
             print("[DB] anime.folder_name Spalte hinzugefügt")
     except Exception as exception:
+        database.rollback()
         print(f"[DB-ERROR] Migration anime.folder_name: {exception}")
 
-    database.commit()
-    database.close()
+    # Indizes für häufige Abfragen (queue.anime_url ist bereits UNIQUE und damit indiziert)
+    cursor.execute("DROP INDEX IF EXISTS idx_queue_position")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_queue_order ON queue(position, added_at, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_queue_anime_id ON queue(anime_id)")
+    _create_anime_indexes(cursor)
+    global _fts_enabled
+    _fts_enabled = _setup_anime_fts(cursor)
 
-def update_index():
-    """Reindexiert die anime-Tabelle sequentiell (mit Transaktions-Sicherheit)"""
-    database = connect()
-    cursor = database.cursor()
-    try:
-        database.execute("BEGIN TRANSACTION")
-        cursor.execute("CREATE TEMPORARY TABLE anime_backup AS SELECT * FROM anime;")
-        cursor.execute("DROP TABLE anime;")
-        cursor.execute("""
-            CREATE TABLE anime (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT, url TEXT UNIQUE,
-                complete INTEGER DEFAULT 0,
-                deutsch_komplett INTEGER DEFAULT 0,
-                deleted INTEGER DEFAULT 0,
-                fehlende_deutsch_folgen TEXT DEFAULT '[]',
-                last_film INTEGER DEFAULT 0,
-                last_episode INTEGER DEFAULT 0,
-                last_season INTEGER DEFAULT 0,
-                folder_name TEXT DEFAULT NULL
-            )
-        """)
-        cursor.execute("""
-            INSERT INTO anime (title, url, complete, deutsch_komplett, deleted, fehlende_deutsch_folgen, last_film, last_episode, last_season, folder_name)
-            SELECT title, url, complete, deutsch_komplett, deleted, fehlende_deutsch_folgen, last_film, last_episode, last_season, folder_name
-            FROM anime_backup
-        """)
-        cursor.execute("DROP TABLE anime_backup;")
-        database.commit()
-        print("[DB] Index reindexiert")
-    except Exception as e:
-        database.rollback()
-        print(f"[DB-ERROR] update_index fehlgeschlagen, Rollback übernommen: {e}")
-    finally:
-        database.close()
+    # Statistiken für den Query-Planer einmalig erzeugen, sobald Daten vorhanden sind
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+    if cursor.fetchone() is None:
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM anime)")
+        if cursor.fetchone()[0]:
+            cursor.execute("ANALYZE")
+
+    database.commit()
 
 def add_url_to_db(url):
     if url.startswith("https://s.to") or url.startswith("https://aniworld.to"): 
-        database = connect()
+        database = get_connection()
         cursor = database.cursor()
         title = get_series_title(url)
         if not title:
             print(f"[ERROR] Konnte Titel für URL nicht abrufen: {url}")
             title = url
-        cursor.execute("INSERT OR IGNORE INTO anime (url, title) VALUES (?, ?)", (url, title))
-        database.commit()
-        database.close()
+        with _write_lock, database:
+            cursor.execute("INSERT OR IGNORE INTO anime (url, title) VALUES (?, ?)", (url, title))
     else:
         print(f"Ungültige URL: {url}. Nur s.to und aniworld.to URLs werden unterstützt.")
 
-def set_completion_status(db_id: int, complete: bool) -> None:
-    database = connect()
+def add_urls_to_db(urls: list) -> int:
+    """
+    Fügt mehrere URLs in einer einzigen Transaktion zur Datenbank hinzu.
+    Gibt die Anzahl der neu eingefügten Serien zurück.
+    """
+    database = get_connection()
     cursor = database.cursor()
-    cursor.execute("UPDATE anime SET complete = ? WHERE id = ?", (1 if complete else 0, id))
-    database.commit()
-    database.close()
+    # Bereits gespeicherte URLs überspringen, damit für sie kein Titel abgerufen wird
+    cursor.execute("SELECT url FROM anime")
+    known_urls = {url for (url,) in cursor.fetchall()}
+    valid_urls = []
+    # Doppelte URLs (z.B. mehrfach in AniLoader.txt) nur einmal abrufen
+    for url in dict.fromkeys(urls):
+        if url in known_urls:
+            continue
+        if not (url.startswith("https://s.to") or url.startswith("https://aniworld.to")):
+            print(f"Ungültige URL: {url}. Nur s.to und aniworld.to URLs werden unterstützt.")
+            continue
+        valid_urls.append(url)
+    if not valid_urls:
+        return 0
+    with ThreadPoolExecutor(max_workers=TITLE_FETCH_WORKERS) as executor:
+        titles = list(executor.map(get_series_title, valid_urls))
+    entries = []
+    for url, title in zip(valid_urls, titles):
+        if not title:
+            print(f"[ERROR] Konnte Titel für URL nicht abrufen: {url}")
+            title = url
+        entries.append((url, title))
+    with _write_lock, database:
+        cursor.executemany("INSERT OR IGNORE INTO anime (url, title) VALUES (?, ?)", entries)
+    return cursor.rowcount
 
-def set_last_downloaded_episode(db_id: int, season: int, episode: int) -> None:
-    database = connect()
+# Spalten, die update_anime setzen darf (die Namen landen im SQL, daher nur bekannte Spalten)
+_ANIME_UPDATE_COLUMNS = frozenset({
+    "title", "complete", "deutsch_komplett", "deleted", "fehlende_deutsch_folgen",
+    "last_film", "last_episode", "last_season", "folder_name",
+})
+
+def update_anime(db_id: int, **fields) -> None:
+    """Setzt mehrere Spalten einer Serie mit einem einzigen UPDATE und Commit."""
+    if not fields:
+        return
+    unknown_columns = fields.keys() - _ANIME_UPDATE_COLUMNS
+    if unknown_columns:
+        raise ValueError(f"Unbekannte Spalten für anime: {sorted(unknown_columns)}")
+    values = []
+    for column, value in fields.items():
+        if column == "fehlende_deutsch_folgen" and isinstance(value, list):
+            value = dump_missing_episodes(value)
+        elif isinstance(value, bool):
+            value = 1 if value else 0
+        values.append(value)
+    assignments = ", ".join(f"{column} = ?" for column in fields)
+    database = get_connection()
     cursor = database.cursor()
-    cursor.execute("UPDATE anime SET last_season = ?, last_episode = ? WHERE id = ?", (season, episode, db_id))
-    database.commit()
-    database.close()
+    with _write_lock, database:
+        cursor.execute(f"UPDATE anime SET {assignments} WHERE id = ?", (*values, db_id))
 
-def set_last_downloaded_season(db_id: int, season: int) -> None:
-    database = connect()
+def set_deleted_status(db_id: int, deleted: bool) -> None:
+    database = get_connection()
     cursor = database.cursor()
-    cursor.execute("UPDATE anime SET last_season = ? WHERE id = ?", (season, db_id))
-    database.commit()
-    database.close()
+    with _write_lock, database:
+        cursor.execute("UPDATE anime SET deleted = ? WHERE id = ?", (1 if deleted else 0, db_id))
 
-def set_last_downloaded_film(db_id: int, film_number: int) -> None:
-    database = connect()
+def set_last_downloaded_episode(db_id: int, season: int, episode: int, film_number: int | None = None) -> None:
+    """Speichert den Fortschritt; bei Filmen wird last_film im selben UPDATE mitgeschrieben."""
+    database = get_connection()
     cursor = database.cursor()
-    cursor.execute("UPDATE anime SET last_film = ? WHERE id = ?", (film_number, db_id))
-    database.commit()
-    database.close()
+    with _write_lock, database:
+        if film_number is None:
+            cursor.execute("UPDATE anime SET last_season = ?, last_episode = ? WHERE id = ?", (season, episode, db_id))
+        else:
+            cursor.execute(
+                "UPDATE anime SET last_season = ?, last_episode = ?, last_film = ? WHERE id = ?",
+                (season, episode, film_number, db_id),
+            )
 
-def set_deutsch_completion(db_id: int, complete: bool) -> None:
-    database = connect()
+def set_last_downloaded_season(db_id: int, season: int) -> None:
+    database = get_connection()
     cursor = database.cursor()
-    cursor.execute("UPDATE anime SET deutsch_komplett = ? WHERE id = ?", (1 if complete else 0, id))
-    database.commit()
-    database.close()
+    with _write_lock, database:
+        cursor.execute("UPDATE anime SET last_season = ? WHERE id = ?", (season, db_id))
 
-def set_missing_german_episodes(db_id: int, fehlende_folgen: list) -> None:
-    database = connect()
+def set_german_status(db_id: int, deutsch_komplett: bool, fehlende_folgen: list | None = None) -> None:
+    """Setzt deutsch_komplett und (falls übergeben) fehlende_deutsch_folgen mit einem einzigen UPDATE."""
+    database = get_connection()
     cursor = database.cursor()
-    cursor.execute("UPDATE anime SET fehlende_deutsch_folgen = ? WHERE id = ?", (str(fehlende_folgen), id))
-    database.commit()
-    database.close()
+    with _write_lock, database:
+        if fehlende_folgen is None:
+            cursor.execute("UPDATE anime SET deutsch_komplett = ? WHERE id = ?", (1 if deutsch_komplett else 0, db_id))
+        else:
+            cursor.execute(
+                "UPDATE anime SET deutsch_komplett = ?, fehlende_deutsch_folgen = ? WHERE id = ?",
+                (1 if deutsch_komplett else 0, dump_missing_episodes(fehlende_folgen), db_id),
+            )
 
 def update_title():
-    database = connect()
+    database = get_connection()
     cursor = database.cursor()
     cursor.execute("SELECT id, url, title FROM anime")
-    for anime_id, url, current_title in cursor.fetchall():
-        if not current_title or current_title == url:
-            title = get_series_title(url)
-            if title:
-                cursor.execute("UPDATE anime SET title = ? WHERE id = ?", (title, anime_id))
-    database.commit()
-    database.close()
+    rows = [(anime_id, url) for anime_id, url, current_title in cursor.fetchall()
+            if not current_title or current_title == url]
+    # Titel parallel abrufen (reines Netzwerk-Warten), geschrieben wird danach im Hauptthread
+    with ThreadPoolExecutor(max_workers=TITLE_FETCH_WORKERS) as executor:
+        titles = list(executor.map(get_series_title, [url for _, url in rows]))
+    updates = [(title, anime_id) for (anime_id, _), title in zip(rows, titles) if title]
+    # Titel erst abrufen, dann alle Updates in einer Schreib-Transaktion
+    if updates:
+        with _write_lock, database:
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.executemany("UPDATE anime SET title = ? WHERE id = ?", updates)
 
-def get_last_downloaded_episode(db_id: int) ->int:
-    database = connect()
+def get_anime_state(db_id: int) -> dict:
+    """Lädt Status, fehlende deutsche Episoden und Fortschritt einer Serie mit einer Abfrage."""
+    database = get_connection()
     cursor = database.cursor()
-    cursor.execute("SELECT last_episode FROM anime WHERE id = ?", (db_id,))
+    cursor.execute(
+        "SELECT complete, deutsch_komplett, fehlende_deutsch_folgen, last_film, last_episode, last_season FROM anime WHERE id = ?",
+        (db_id,),
+    )
     result = cursor.fetchone()
-    database.close()
-    if result:
-        return result[0]
-    raise Exception(f"Keine Serie mit ID {db_id} gefunden.")
-
-def get_last_downloaded_season(db_id: int) ->int:
-    database = connect()
-    cursor = database.cursor()
-    cursor.execute("SELECT last_season FROM anime WHERE id = ?", (db_id,))
-    result = cursor.fetchone()
-    database.close()
-    if result:
-        return result[0]
-    raise Exception(f"Keine Serie mit ID {db_id} gefunden.")
+    if result is None:
+        raise Exception(f"Keine Serie mit ID {db_id} gefunden.")
+    complete, deutsch_komplett, fehlende_deutsch_folgen, last_film, last_episode, last_season = result
+    return {
+        "complete": bool(complete),
+        "deutsch_komplett": bool(deutsch_komplett),
+        "fehlende_deutsch_folgen": parse_missing_episodes(fehlende_deutsch_folgen),
+        "last_film": last_film,
+        "last_episode": last_episode,
+        "last_season": last_season,
+    }
 
-def get_last_downloaded_film(db_id: int) ->int:
-    database = connect()
-    cursor = database.cursor()
-    cursor.execute("SELECT last_film FROM anime WHERE id = ?", (db_id,))
-    result = cursor.fetchone()
-    database.close()
-    if result:
-        return result[0]
-    raise Exception(f"Keine Serie mit ID {db_id} gefunden.")
-
-def get_completion_status(db_id: int) -> bool:
+def get_series_for_download(complete: bool | None = None, deutsch_komplett: bool | None = None) -> list[tuple[int, str, str, bool]]:
     """
-    Docstring for get_completion_status
-    
-    :param db_id: ID der Serie
-    :type db_id: int
-    :return: Status der Vollständigkeit (True wenn komplett, False wenn nicht)
-    :rtype: bool
+    Lädt id, Titel, URL und ob die Serie in der Warteschlange steht, für alle nicht gelöschten Serien mit einer einzigen Abfrage.
+    Mit complete/deutsch_komplett werden nur Serien mit diesem Status geladen (None = ohne Filter).
+    Serien aus der Warteschlange kommen in deren Reihenfolge zuerst, danach alle übrigen nach id.
     """
-    database = connect()
-    cursor = database.cursor()
-    cursor.execute("SELECT complete FROM anime WHERE id = ?", (db_id,))
-    result = cursor.fetchone()
-    database.close()
-    if result is not None:
-        return bool(result[0])
-    raise Exception(f"Keine Serie mit ID {db_id} gefunden.")
-
-def get_deutsch_completion_status(db_id: int) -> bool:
-    database = connect()
-    cursor = database.cursor()
-    cursor.execute("SELECT deutsch_komplett FROM anime WHERE id = ?", (db_id,))
-    result = cursor.fetchone()
-    database.close()
-    if result is not None:
-        return bool(result[0])
-    raise Exception(f"Keine Serie mit ID {db_id} gefunden.")
-
-def get_missing_german_episodes(db_id: int) -> list:
-    database = connect()
-    cursor = database.cursor()
-    cursor.execute("SELECT fehlende_deutsch_folgen FROM anime WHERE id = ?", (db_id,))
-    result = cursor.fetchone()
-    database.close()
-    if result is not None:
-        return eval(result[0])  # Achtung: eval kann gefährlich sein, wenn die Daten nicht vertrauenswürdig sind
-    raise Exception(f"Keine Serie mit ID {db_id} gefunden.")
-
-def get_series_url_from_db(db_id: int) -> str:
-    database = connect()
-    cursor = database.cursor()
-    cursor.execute("SELECT url FROM anime WHERE id = ?", (db_id,))
-    result = cursor.fetchone()
-    database.close()
-    if result:
-        return result[0]
-    raise Exception(f"Keine Serie mit ID {db_id} gefunden.")
-
-def get_series_title_from_db(db_id: int) -> str:
-
-    database = connect()
+    conditions = ["anime.deleted = 0"]
+    params = []
+    if complete is not None:
+        conditions.append("anime.complete = ?")
+        params.append(1 if complete else 0)
+    if deutsch_komplett is not None:
+        conditions.append("anime.deutsch_komplett = ?")
+        params.append(1 if deutsch_komplett else 0)
+    database = get_connection()
     cursor = database.cursor()
-    cursor.execute("SELECT title FROM anime WHERE id = ?", (db_id,))
-    result = cursor.fetchone()
-    database.close()
-    if result:
-        return result[0]
-    raise Exception(f"Keine Serie mit ID {db_id} gefunden.")
+    cursor.execute(f"""
+        SELECT anime.id, anime.title, anime.url, queue.id IS NOT NULL
+        FROM anime
+        LEFT JOIN queue ON queue.anime_url = anime.url
+        WHERE {" AND ".join(conditions)}
+        ORDER BY queue.id IS NULL, queue.position, queue.added_at, queue.id, anime.id
+    """, params)
+    return cursor.fetchall()
 
-def check_index_exist(index: int) -> bool:
-    database = connect()
+def get_folder_name_by_url(url: str) -> str | None:
+    """Gibt den gespeicherten Ordnernamen für eine Serien-URL mit einer einzigen Abfrage zurück."""
+    database = get_connection()
     cursor = database.cursor()
-    cursor.execute("SELECT id FROM anime WHERE id = ?", (index,))
+    cursor.execute("SELECT folder_name FROM anime WHERE url = ?", (url,))
     result = cursor.fetchone()
-    database.close()
-    if result is not None:
-        return True
-    return False
-
-def get_folder_name_from_db(db_id: int) -> str | None:
-    """Gibt den gespeicherten Ordnernamen für eine Serie zurück (z.B. 'Titel (2020) [tt1234567]')."""
-    database = connect()
-    cursor = database.cursor()
-    cursor.execute("SELECT folder_name FROM anime WHERE id = ?", (db_id,))
-    result = cursor.fetchone()
-    database.close()
     if result:
         return result[0]
     return None
 
-def set_folder_name_in_db(db_id: int, folder_name: str) -> None:
-    """Speichert den Ordnernamen für eine Serie in der Datenbank."""
-    database = connect()
-    cursor = database.cursor()
-    cursor.execute("UPDATE anime SET folder_name = ? WHERE id = ?", (folder_name, db_id))
-    database.commit()
-    database.close()
-
-def get_db_id_by_url(url: str) -> int | None:
-    """Gibt die Datenbank-ID für eine URL zurück."""
-    database = connect()
+def ensure_folder_name_by_url(url: str, folder_name: str) -> str | None:
+    """
+    Speichert folder_name für die URL, falls noch keiner gesetzt ist, und gibt den
+    gespeicherten Ordnernamen zurück (None, wenn die URL nicht in der Datenbank ist).
+    """
+    database = get_connection()
     cursor = database.cursor()
-    cursor.execute("SELECT id FROM anime WHERE url = ?", (url,))
-    result = cursor.fetchone()
-    database.close()
+    with _write_lock, database:
+        if sqlite3.sqlite_version_info >= (3, 35, 0):
+            cursor.execute(
+                "UPDATE anime SET folder_name = COALESCE(NULLIF(folder_name, ''), ?) WHERE url = ? RETURNING folder_name",
+                (folder_name, url),
+            )
+            result = cursor.fetchone()
+        else:
+            cursor.execute("SELECT folder_name FROM anime WHERE url = ?", (url,))
+            result = cursor.fetchone()
+            if result and not result[0]:
+                cursor.execute("UPDATE anime SET folder_name = ? WHERE url = ?", (folder_name, url))
+                result = (folder_name,)
     if result:
         return result[0]
     return None
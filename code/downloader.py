@@ -1,91 +1,524 @@
 from database import (
-    get_missing_german_episodes, 
-    set_completion_status,
-    get_series_title_from_db,
-    get_series_url_from_db, 
-    get_last_downloaded_episode,
-    get_last_downloaded_season,
-    get_last_downloaded_film,
-    get_completion_status, 
-    get_deutsch_completion_status,   
-    set_missing_german_episodes,
-    set_deutsch_completion, 
+    get_anime_state,
+    update_anime,
+    get_series_for_download,
+    set_german_status,
     set_last_downloaded_episode, 
-    set_last_downloaded_film, 
-    set_last_downloaded_season, 
-    check_index_exist
+    set_last_downloaded_season
              )
 
 from html_request import (
     get_seasons_with_episode_count, 
     get_languages_for_episode, 
-    get_episode_title
+    get_episode_title,
+    prefetch_episodes,
+    clear_episode_caches
             )
 
 from file_management import (
     move_and_rename_downloaded_file, 
     delete_old_non_german_version, 
-    get_existing_file_path, 
-    find_downloaded_file
+    find_downloaded_file,
+    index_existing_episodes,
+    has_indexed_episode,
+    find_existing_episode,
+    record_indexed_episode,
+    is_non_german_file,
+    clear_folder_name_cache
             )
 
 from url_builder import get_episode_url
+from helper import is_movie_season, season_number
 from config import load_config
 from logger import start_run_logging, stop_run_logging
 import subprocess
+import threading
 import time
+import io
+import os
+import re
+import signal
+import sys
+from collections import deque
+
+# Nur die letzten Zeilen der aniworld-Ausgabe behalten (für die Fehlerausgabe), statt alles zu puffern
+DOWNLOAD_OUTPUT_TAIL = 200
+# Eindeutige Fehlermeldungen von aniworld, bei denen der Prozess sofort abgebrochen wird
+_RE_DOWNLOAD_ERROR = re.compile("|".join(map(re.escape, [
+    "No streams available for episode",
+    "No provider found for language",
+])))
+
+# Stopp-Anforderung aus der API (/stop); wird in den Serien- und Episodenschleifen geprüft
+_stop_flag = threading.Event()
+
+def request_stop() -> None:
+    """Fordert den Abbruch des laufenden Downloads an (nach der aktuellen Episode)."""
+    _stop_flag.set()
+
+def clear_stop_request() -> None:
+    """Setzt eine alte Stopp-Anforderung zurück; vor dem Start des Download-Threads aufrufen."""
+    _stop_flag.clear()
+
+# Nach je so vielen Serien aus der Warteschlange wird eine Serie aus dem übrigen Bestand eingeschoben,
+# damit eine lange Warteschlange den Rest nicht beliebig lange blockiert
+QUEUE_BACKLOG_INTERLEAVE = 3
+
+def interleave_series(series_list: list, every: int = QUEUE_BACKLOG_INTERLEAVE) -> list[tuple[int, str, str]]:
+    """
+    Teilt die Serien in Warteschlange (Q1) und übrigen Bestand (Q2) und schiebt nach je `every` Serien
+    aus Q1 eine aus Q2 ein. Ist Q1 leer bzw. aufgebraucht, folgt der restliche Bestand in seiner Reihenfolge.
+    """
+    queued = [(db_id, title, url) for db_id, title, url, in_queue in series_list if in_queue]
+    backlog = deque((db_id, title, url) for db_id, title, url, in_queue in series_list if not in_queue)
+    ordered = []
+    for position, serie in enumerate(queued, start=1):
+        ordered.append(serie)
+        if every > 0 and position % every == 0 and backlog:
+            ordered.append(backlog.popleft())
+    ordered.extend(backlog)
+    return ordered
+
+def select_language(sprachen: list, languages: list) -> str | None:
+    """Gibt die erste verfügbare Sprache in der Reihenfolge der Konfiguration zurück (None, wenn keine passt)."""
+    available = set(sprachen)
+    for sprache in languages:
+        if sprache in available:
+            return sprache
+    return None
+
+def _download_episode(db_id: int, serien_url: str, season: str, episode: str, config: dict, existing_episodes: dict) -> tuple[str | None, bool]:
+    """
+    Lädt eine Episode in der ersten verfügbaren Sprache aus der Konfiguration herunter, verschiebt und benennt
+    die Datei, trägt sie in den Index ein und speichert den Fortschritt.
+    Gibt die gewählte Sprache (None, wenn nichts gestartet wurde) und ob die Datei abgelegt wurde zurück.
+    """
+    episode_url = get_episode_url(serien_url, season, episode)
+    sprachen = get_languages_for_episode(episode_url)
+    if sprachen == -1:
+        print(f"[ERROR] Could not retrieve languages for episode: {episode_url}")
+        return None, False
+    sprache = select_language(sprachen, config.get('languages'))
+    if sprache is None:
+        print(f"[SKIP] Keine der konfigurierten Sprachen für {episode_url} verfügbar.")
+        return None, False
+
+    cmd = str(f'aniworld --language "{sprache}" -a Download -o "{config.get("download_path")}" {episode_url}')
+    try:
+        print(f"\n[OK] Starting download command: {cmd}")
+        if start_download_process(cmd):
+            print(f"[OK] Download successful for S{season_number(season):02d}E{int(episode):03d}")
+    except Exception as e:
+        print(f"[ERROR] Error during download process: {e}")
+        return sprache, False
+
+    downloaded_file = find_downloaded_file(season=season, episode=episode, config=config, url=serien_url)
+    if downloaded_file is None:
+        print(f"[ERROR] Download failed for S{season_number(season):02d}E{int(episode):03d}. No file found after download process.")
+        return sprache, False
+
+    print(f"[VERIFY] File found: {get_episode_title(episode_url)}")
+    final_file = move_and_rename_downloaded_file(serien_url=serien_url, season=season, episode=episode, language=sprache)
+    record_indexed_episode(existing_episodes, season, episode, final_file)
+
+    # Nach Abschluss des Downloads die letzte heruntergeladene Episode aktualisieren (inklusive Filme in Staffel 0)
+    set_last_downloaded_episode(db_id, season_number(season), int(episode), film_number=int(episode) if is_movie_season(season) else None)
+    return sprache, True
+
+def _kill_process_tree(process: subprocess.Popen) -> None:
+    """Beendet die Shell samt aniworld-Prozess; terminate() allein trifft nur die Shell."""
+    try:
+        if os.name == "nt":
+            subprocess.run(["taskkill", "/T", "/F", "/PID", str(process.pid)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        else:
+            os.killpg(process.pid, signal.SIGTERM)
+    except (ProcessLookupError, OSError) as error:
+        print(f"[ERROR] Download-Prozess konnte nicht beendet werden: {error}")
 
 def start_download_process(cmd_command: str) -> bool:
+    process = None
     try:
         # Set Windows console to UTF-8 (65001) before running aniworld
         # Use shell=True for Windows to handle the chcp command and & operator correctly
         utf8_cmd = f"chcp 65001 >nul & {cmd_command}"
-        result = subprocess.run(utf8_cmd, shell=True)
+        # Eigene Prozessgruppe, damit bei einem Abbruch auch der aniworld-Prozess unter der Shell beendet wird
+        if os.name == "nt":
+            group_args = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            group_args = {"start_new_session": True}
+        process = subprocess.Popen(utf8_cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, **group_args)
+        # Ausgabe zeilenweise streamen; newline="" erhält "\r", damit Fortschrittsbalken in der Konsole überschrieben werden
+        output = io.TextIOWrapper(process.stdout, encoding="utf-8", errors="replace", newline="")
+        output_tail = deque(maxlen=DOWNLOAD_OUTPUT_TAIL)
+        # Ohne Konsole (pythonw, Dienst) ist sys.__stdout__ None; die Ausgabe landet dann nur in output_tail
+        console = sys.__stdout__
+        aborted = False
+        for line in output:
+            if console is not None:
+                console.write(line)
+                console.flush()
+            output_tail.append(line)
+            if _RE_DOWNLOAD_ERROR.search(line):
+                aborted = True
+                _kill_process_tree(process)
+                break
+        output.close()
+        returncode = process.wait()
+        if aborted or returncode != 0:
+            print(f"[ERROR] Download fehlgeschlagen (Exit-Code {returncode}). Letzte Ausgabe:")
+            print("".join(output_tail).replace("\r", "\n").rstrip())
+            return False
         # Wait for file system to catch up after download and for .part files to be finalized
-        # Check for up to 30 seconds if .part files are being written
-        if result.returncode == 0:
-            time.sleep(5)  # Give some initial time for file operations
-        return result.returncode == 0
+        time.sleep(5)  # Give some initial time for file operations
+        return True
     except Exception as error:
         print(f"Fehler beim Download: {error}")
+        if process is not None and process.poll() is None:
+            _kill_process_tree(process)
         return False
 
 
 
-def download(mode: str = "default"):
+#================================================
+#Default Mode
+#================================================
+
+def _run_default_mode(db_id: int, title: str, serien_url: str, seasons_with_episode_count: dict, anime_state: dict, config: dict) -> None:
+    """Lädt alle noch fehlenden Episoden einer Serie ab dem gespeicherten Fortschritt herunter."""
+    missing_german_episodes = []
+    downloaded_episodes = 0  # Counter für heruntergeladene Episoden
+
+    # Überprüfe, ob die Serie bereits komplett heruntergeladen wurde
+    if anime_state["complete"]:
+        print(f"[SKIP] Serie '{title}' bereits komplett heruntergeladen.")
+        return
+
+
+
+    last_downloaded_film = anime_state["last_film"]
+    last_downloaded_season = anime_state["last_season"]
+    last_downloaded_episode = anime_state["last_episode"]
+    def already_downloaded(season: str, episode: str) -> bool:
+        # Bereits geladene Filme und Episoden vor dem Fortschritt der zuletzt bearbeiteten Staffel
+        # (spätere Staffeln beginnen wieder bei Episode 1)
+        if is_movie_season(season) and int(episode) < last_downloaded_film:
+            return True
+        return season_number(season) == last_downloaded_season and int(episode) < last_downloaded_episode
+
+    # Bereits heruntergeladene Staffeln überspringen; nur die übrigen Ordner einmal einlesen
+    pending_seasons = [season for season in seasons_with_episode_count if season_number(season) >= last_downloaded_season]
+    existing_episodes = index_existing_episodes(serien_url, pending_seasons, config)
+
+    for season in pending_seasons:
+        pending_episodes = [episode for episode in seasons_with_episode_count[season] if not already_downloaded(season, episode)]
+        # Titel und Sprachen der noch offenen Episoden dieser Staffel parallel vorladen
+        prefetch_episodes([
+            get_episode_url(serien_url, season, episode)
+            for episode in pending_episodes
+            if not has_indexed_episode(existing_episodes, season, episode)
+        ])
+        for episode in pending_episodes:
+            if _stop_flag.is_set():
+                break
+
+            if find_existing_episode(existing_episodes, serien_url, season, episode, config) is not None:
+                print(f"[SKIP] Datei für S{season_number(season):02d}E{int(episode):03d} bereits vorhanden. ")
+                continue
+
+            sprache, downloaded = _download_episode(db_id, serien_url, season, episode, config, existing_episodes)
+            if sprache is not None and sprache != "German Dub":
+                missing_german_episodes.append(get_episode_url(serien_url, season, episode))
+            if downloaded:
+                downloaded_episodes += 1
+
+        # Nach Abschluss einer Staffel die letzte heruntergeladene Staffel aktualisieren      
+        set_last_downloaded_season(db_id, season_number(season))
+        # Bei einem Stopp die bisher gesammelten Sprachinfos noch speichern, aber nicht als komplett markieren
+        if _stop_flag.is_set():
+            break
+
+
+    # Nach Abschluss aller Downloads den Status der deutschen Vollständigkeit aktualisieren
+    # Abschluss-Status sammeln und mit einem UPDATE schreiben
+    updates = {}
+    if missing_german_episodes:
+        # Gespeicherte Liste um die neuen Episoden ergänzen
+        allready_missing_german_episodes = anime_state["fehlende_deutsch_folgen"]
+        updates["deutsch_komplett"] = False
+        updates["fehlende_deutsch_folgen"] = list(dict.fromkeys(allready_missing_german_episodes + missing_german_episodes))
+    else:
+        updates["deutsch_komplett"] = not anime_state["fehlende_deutsch_folgen"]
+
+    # Nur als komplett markieren, wenn mindestens eine Episode heruntergeladen wurde
+    if _stop_flag.is_set():
+        print(f"[INFO] Download für Series {db_id} gestoppt. Status wird NICHT auf komplett gesetzt.")
+    elif downloaded_episodes > 0:
+        updates["complete"] = True
+    else:
+        print(f"[INFO] Keine neuen Episoden heruntergeladen für Series {db_id}. Status wird NICHT auf komplett gesetzt.")
+    update_anime(db_id, **updates)
+
+
+#================================================
+#German Mode
+#================================================
+
+def _run_german_mode(db_id: int, title: str, serien_url: str, seasons_with_episode_count: dict, anime_state: dict, config: dict) -> None:
+    """Lädt die als fehlend gespeicherten deutschen Episoden einer Serie nach und ersetzt ältere Versionen."""
+    if anime_state["deutsch_komplett"]:
+        print(f"[SKIP] Serie '{title}' bereits komplett auf Deutsch verfügbar.")
+        return           
+    deutsch = "German Dub"
+    missing_german_episodes = anime_state["fehlende_deutsch_folgen"]
+    # Änderungen an fehlende_deutsch_folgen sammeln und pro Serie nur einmal schreiben
+    german_status_changed = False
+    # Set für die Mitgliedschaftsprüfung je Episode; die Liste behält die gespeicherte Reihenfolge
+    pending_german_episodes = set(missing_german_episodes)
+    existing_episodes = index_existing_episodes(serien_url, seasons_with_episode_count, config)
+    try:
+        for season in seasons_with_episode_count:
+            # Sprachen (und Titel) der fehlenden Episoden dieser Staffel parallel vorladen
+            prefetch_episodes([
+                episode_url for episode_url in
+                (get_episode_url(serien_url, season, episode) for episode in seasons_with_episode_count[season])
+                if episode_url in pending_german_episodes
+            ])
+            for episode in seasons_with_episode_count[season]:
+                if _stop_flag.is_set():
+                    return
+                episode_url = get_episode_url(serien_url, season, episode)
+                if episode_url in pending_german_episodes:
+                    sprachen = get_languages_for_episode(episode_url)
+                    if sprachen == -1:
+                        print(f"[ERROR] Could not retrieve languages for episode: {episode_url}")
+                        continue
+                    if deutsch not in sprachen:
+                        print(f"[SKIP] Episode {episode_url} noch nicht auf Deutsch verfügbar.")
+                        continue
+
+                    cmd = str(f'aniworld --language "{deutsch}" -a Download -o "{config.get("download_path")}" {episode_url}')
+                    try:
+                        print(f"\n[OK] Starting download command: {cmd}")
+                        succes = start_download_process(cmd)
+                        if succes:
+                            existing_file = find_existing_episode(existing_episodes, serien_url, season, episode, config)
+                            if existing_file is not None:
+                                if is_non_german_file(existing_file):
+                                    # Gefundene Datei direkt löschen statt den Ordner erneut zu durchsuchen
+                                    delete_old_non_german_version(serien_url=serien_url, season=season, episode=episode, config=config, file_path=existing_file)
+
+                                print(f"[VERIFY] File found: {get_episode_title(episode_url)}")
+                                final_file = move_and_rename_downloaded_file(serien_url=serien_url, season=season, episode=episode, language=deutsch)
+                                record_indexed_episode(existing_episodes, season, episode, final_file)
+                                print(f"[OK ] Download successfull for episode {episode_url}")
+                                pending_german_episodes.discard(episode_url)
+                                german_status_changed = True
+                            elif existing_file is None:
+                                print(f"[ERROR] Download failed for episode {episode_url}. No file found after download process.")
+                                continue
+
+                    except Exception as e:
+                        print(f"[ERROR] Error during download process: {e}")
+                        continue
+    finally:
+        if german_status_changed:
+            missing_german_episodes = [url for url in missing_german_episodes if url in pending_german_episodes]
+            set_german_status(db_id, len(missing_german_episodes) == 0, missing_german_episodes)
+
+
+#================================================
+#Check Missing Mode
+#================================================
+
+def _run_check_missing_mode(db_id: int, title: str, serien_url: str, seasons_with_episode_count: dict, anime_state: dict, config: dict) -> None:
+    """Prüft alle Episoden einer Serie und lädt fehlende Dateien nach."""
+    missing_german_episodes = []
+    # Vorhandene Dateien der Serie einmal einlesen statt jede Episode einzeln zu suchen
+    existing_episodes = index_existing_episodes(serien_url, seasons_with_episode_count, config)
+
+    for season in seasons_with_episode_count:
+        # Titel und Sprachen nur für Episoden vorladen, die nicht schon über den Index gefunden wurden
+        prefetch_episodes([
+            get_episode_url(serien_url, season, episode)
+            for episode in seasons_with_episode_count[season]
+            if not has_indexed_episode(existing_episodes, season, episode)
+        ])
+        for episode in seasons_with_episode_count[season]:
+            if _stop_flag.is_set():
+                return
+
+            existing_file = find_existing_episode(existing_episodes, serien_url, season, episode, config)
+            if existing_file is not None:
+                print(f"[SKIP] Datei für S{season_number(season):02d}E{int(episode):03d} bereits vorhanden.")
+                if is_non_german_file(existing_file):
+                    missing_german_episodes.append(get_episode_url(serien_url, season, episode))
+                continue
+
+            sprache, downloaded = _download_episode(db_id, serien_url, season, episode, config, existing_episodes)
+            if sprache is not None and sprache != "German Dub":
+                missing_german_episodes.append(get_episode_url(serien_url, season, episode))
+
+        # Nach Abschluss einer Staffel die letzte heruntergeladene Staffel aktualisieren
+        set_last_downloaded_season(db_id, season_number(season))
+
+
+#================================================
+#New Mode
+#================================================
+
+def _run_new_mode(db_id: int, title: str, serien_url: str, seasons_with_episode_count: dict, anime_state: dict, config: dict) -> None:
+    """Lädt bei kompletten Serien neu erschienene Staffeln, Episoden und Filme herunter."""
+    missing_german_episodes = []
+    # Nur bei kompletten Serien auf neue Episoden prüfen
+    if not anime_state["complete"]:
+        print(f"[SKIP] Serie '{title}' noch nicht komplett heruntergeladen. Bitte zuerst im 'default' Modus ausführen.")
+        return
+
+    # Letzte heruntergeladene Werte aus DB holen
+    last_downloaded_season = anime_state["last_season"]
+    last_downloaded_episode = anime_state["last_episode"]
+    last_downloaded_film = anime_state["last_film"]
+
+    # Letzte verfügbare Werte ermitteln (numerisch vergleichen, "10" > "9"; "filme" ist keine Staffelnummer)
+    last_available_season = max((staffel for staffel in seasons_with_episode_count if staffel.isdigit()), key=int, default="0")
+    if str(last_downloaded_season) in seasons_with_episode_count:
+        last_available_episode = max(seasons_with_episode_count[str(last_downloaded_season)], key=int, default=0) 
+    else:
+        last_available_episode = 0
+    last_available_film = 0
+    if "0" in seasons_with_episode_count:
+        last_available_film = max(seasons_with_episode_count["0"], key=int, default=0)
+    elif "filme" in seasons_with_episode_count:
+        last_available_film = max(seasons_with_episode_count["filme"], key=int, default=0)
+
+    # Bestimmen was heruntergeladen werden soll
+    download_seasons = []
+
+    # Neue Staffel(n) gefunden
+    if int(last_available_season) > last_downloaded_season:
+        print(f"[INFO] Neue Staffel(n) ab Staffel {last_available_season} gefunden.")
+        # Alle neuen Staffeln hinzufügen
+        for staffel in range(last_downloaded_season + 1, int(last_available_season) + 1):
+            if str(staffel) in seasons_with_episode_count:
+                download_seasons.append(str(staffel))
+
+    # Neue Episoden in letzter Staffel
+    elif last_downloaded_season == int(last_available_season) and int(last_available_episode) > last_downloaded_episode:
+        print(f"[INFO] Neue Episode(n) in Staffel {last_downloaded_season} gefunden ab (E{last_downloaded_episode + 1} ")
+        download_seasons.append(str(last_downloaded_season))
+
+    # Neue Filme
+    if int(last_available_film) > last_downloaded_film:
+        print(f"[INFO] Neuer Film/Filme gefunden (Film {last_downloaded_film + 1} bis {last_available_film}).")
+        if "0" in seasons_with_episode_count:
+            download_seasons.append("0")
+        elif "filme" in seasons_with_episode_count:
+            download_seasons.append("filme")
+
+    # Warnungen ausgeben
+    if int(last_available_season) < last_downloaded_season:
+        print(f"[WARN] Die letzte heruntergeladene Staffel {last_downloaded_season} ist höher als die aktuell verfügbare Staffel {last_available_season}. Bitte überprüfe die Serie manuell.")
+        return
+    if last_downloaded_season == int(last_available_season) and int(last_available_episode) < last_downloaded_episode:
+        print(f"[WARN] Die letzte heruntergeladene Episode S{int(last_downloaded_season):02d}E{int(last_downloaded_episode):03d} ist höher als die aktuell verfügbare Episode. Bitte überprüfe die Serie manuell.")
+        return
+
+    if int(last_available_film) > 0 and int(last_available_film) < last_downloaded_film:
+        print(f"[WARN] Der letzte heruntergeladene Film S00E{int(last_downloaded_film):03d} ist höher als der aktuell verfügbare Film S00E{int(last_available_film):03d}. Bitte überprüfe die Serie manuell.")
+        return
+
+    # Wenn nichts Neues gefunden wurde
+    if len(download_seasons) == 0:
+        print(f"[INFO] Keine neuen Episoden oder Filme für '{title}' gefunden.")
+        return
+
+    # Nur die relevanten Staffeln herunterladen, vorhandene Dateien dafür einmal einlesen
+    existing_episodes = index_existing_episodes(serien_url, download_seasons, config)
+    def already_downloaded(season: str, episode: str) -> bool:
+        # Episoden bis zum Fortschritt der letzten Staffel und bereits geladene Filme
+        if season == str(last_downloaded_season) and int(episode) <= last_downloaded_episode:
+            return True
+        return is_movie_season(season) and int(episode) <= last_downloaded_film
+
+    for season in download_seasons:
+        pending_episodes = [episode for episode in seasons_with_episode_count[season] if not already_downloaded(season, episode)]
+        # Titel und Sprachen der neuen Episoden dieser Staffel parallel vorladen
+        prefetch_episodes([
+            get_episode_url(serien_url, season, episode)
+            for episode in pending_episodes
+            if not has_indexed_episode(existing_episodes, season, episode)
+        ])
+        for episode in pending_episodes:
+            if _stop_flag.is_set():
+                return
+
+            # Prüfen ob Datei bereits existiert
+            existing_file = find_existing_episode(existing_episodes, serien_url, season, episode, config)
+            if existing_file is not None:
+                print(f"[SKIP] Datei für S{season_number(season):02d}E{int(episode):03d} bereits vorhanden.")
+                continue
+
+
+            sprache, downloaded = _download_episode(db_id, serien_url, season, episode, config, existing_episodes)
+            if sprache is not None and sprache != "German Dub":
+                missing_german_episodes.append(get_episode_url(serien_url, season, episode))
+
+        # Nach Abschluss einer Staffel die letzte heruntergeladene Staffel aktualisieren
+        set_last_downloaded_season(db_id, season_number(season))
+
+
+# Modus -> Verarbeitung einer Serie; download() übernimmt für alle Modi Laden der Serien, Staffeln und des Status
+_MODE_HANDLERS = {
+    "default": _run_default_mode,
+    "german": _run_german_mode,
+    "check-missing": _run_check_missing_mode,
+    "new": _run_new_mode,
+}
+
+# Status-Filter je Modus für get_series_for_download: Serien, die der Modus ohnehin überspringt,
+# werden gar nicht erst geladen (und ihre Staffeln nicht abgerufen)
+_MODE_SERIES_FILTERS = {
+    "default": {"complete": False},
+    "german": {"deutsch_komplett": False},
+    "check-missing": {},
+    "new": {"complete": True},
+}
+
+def download(mode: str = "default", status: dict | None = None):
     """
     Startet den Download-Prozess basierend auf dem angegebenen Modus.
     - mode: "default" | "german" | "new" | "check-missing"
+    - status: optionales Status-Dict (z.B. für /status), in dem die aktuelle Serie eingetragen wird
     """    
     start_run_logging()
+    clear_episode_caches()
+    clear_folder_name_cache()
     
     try:
-        if mode not in ["default", "german", "new", "check-missing"]:
+        if mode not in _MODE_HANDLERS:
             raise ValueError("Ungültiger Modus. Erlaubte Werte: 'default', 'german', 'new', 'check-missing'.")
         
         config = load_config()
         if not config: 
             raise Exception("Fehler beim Laden der Konfiguration. Bitte überprüfen Sie die config.json.")
-        LANGUAGES = config.get('languages')
-        DOWNLOAD_PATH = config.get('download_path')
         start_download_msg = (f"|| Starting download {mode}  ||")
         print("=" * len(start_download_msg))
         print(start_download_msg)
         print("=" * len(start_download_msg))
         
         
-        next_index_exist = False
-        index = 1
-        if check_index_exist(index):
-            next_index_exist = True
-        else:
-            print("[INFO] Keine Serien in der Datenbank gefunden. Bitte füge zuerst Serien hinzu.")
+        # Alle Serien mit einer Abfrage laden statt pro ID nachzufragen (Warteschlange zuerst, Bestand eingestreut)
+        series_list = interleave_series(get_series_for_download(**_MODE_SERIES_FILTERS[mode]))
+        if not series_list:
+            print(f"[INFO] Keine Serien für Modus '{mode}' gefunden (Datenbank leer oder alle Serien bereits erledigt).")
             return
-        while next_index_exist:
-            db_id = index
+        for db_id, title, serien_url in series_list:
+            if _stop_flag.is_set():
+                print("[INFO] Download wurde gestoppt.")
+                break
+            if status is not None:
+                status.update(current_id=db_id, current_title=title)
             try:
-                title = get_series_title_from_db(db_id)
-                serien_url = get_series_url_from_db(db_id)
                 start_serie_msg = (f"|| Starting download for series: {title} ||")
                 print("=" * len(start_serie_msg))
                 print(start_serie_msg)
@@ -95,369 +528,12 @@ def download(mode: str = "default"):
                 if not seasons_with_episode_count or seasons_with_episode_count == -1:
                     print(f"[ERROR] Could not retrieve seasons or episodes for series: {title}. Got: {seasons_with_episode_count}")
                     continue
-        
-
-    #================================================
-    #Default Mode
-    #================================================
-
-                if mode == "default":
-                    missing_german_episodes = []
-                    downloaded_episodes = 0  # Counter für heruntergeladene Episoden
-                    
-                    # Überprüfe, ob die Serie bereits komplett heruntergeladen wurde
-                    if get_completion_status(db_id) is True:
-                        print(f"[SKIP] Serie '{title}' bereits komplett heruntergeladen.")
-                        continue
-
-                    
-                    if seasons_with_episode_count == -1:
-                        raise Exception("Error retrieving seasons or episodes.")
-                    
-                    last_downloaded_film = get_last_downloaded_film(db_id)
-                    last_downloaded_season = get_last_downloaded_season(db_id)
-                    last_downloaded_episode = get_last_downloaded_episode(db_id)
-
-                    for season in seasons_with_episode_count:
-                        # Überspringe bereits heruntergeladene Staffeln
-                        if (int(season) < last_downloaded_season): 
-                            continue
-                        for episode in seasons_with_episode_count[season]:
-                            # Überspringe bereits heruntergeladene Episoden (inklusive Filme in Staffel 0)
-                            if int(episode) < last_downloaded_episode or (int(episode) < last_downloaded_film and int(season) == 0):
-                                continue
-                            
-                            if get_existing_file_path(serien_url, season, episode, config) is not None:
-                                print(f"[SKIP] Datei für S{int(season):02d}E{int(episode):03d} bereits vorhanden. ")
-                                continue
-                            
-                            episode_url = get_episode_url(serien_url, season, episode)
-                            sprachen = get_languages_for_episode(episode_url)
-                            if sprachen != -1:
-                                if LANGUAGES[0] in sprachen:
-                                    sprache = LANGUAGES[0]
-                                elif LANGUAGES[1] in sprachen:
-                                    sprache = LANGUAGES[1]
-                                elif LANGUAGES[2] in sprachen:
-                                    sprache = LANGUAGES[2]
-                                elif LANGUAGES[3] in sprachen:
-                                    sprache = LANGUAGES[3]
-                                else:
-                                    return -1
-                                if sprache != "German Dub":
-                                        missing_german_episodes.append(episode_url)
-                                cmd = str(f'aniworld --language "{sprache}" -a Download -o "{DOWNLOAD_PATH}" {episode_url}')
-                                try:
-                                    print(f"\n[OK] Starting download command: {cmd}")
-                                    succes = start_download_process(cmd)
-                                    if succes:
-                                        print(f"[OK] Download successful for S{int(season):02d}E{int(episode):03d}")
-                                        downloaded_episodes += 1
-                                except Exception as e:
-                                    print(f"[ERROR] Error during download process: {e}")
-                                    continue  
-                            else:
-                                print(f"[ERROR] Could not retrieve languages for episode: {episode_url}")
-
-
-                            downloaded_file = find_downloaded_file(season=season, episode=episode, config=config, url=serien_url)
-                            if downloaded_file is None:
-                                print(f"[ERROR] Download failed for S{int(season):02d}E{int(episode):03d}. No file found after download process.")
-                                continue
-
-                            elif downloaded_file is not None:
-                                print(f"[VERIFY] File found: {get_episode_title(episode_url)}")
-                                move_and_rename_downloaded_file(serien_url=serien_url, season=season, episode=episode, language=sprache)
-
-                            
-                            # Nach Abschluss des Downloads die letzte heruntergeladene Episode aktualisieren (inklusive Filme in Staffel 0)
-                            if int(season) == 0 or season.strip().lower() == "filme":
-                                set_last_downloaded_film(db_id, int(episode))
-                            set_last_downloaded_episode(db_id, int(season), int(episode))
-
-                        # Nach Abschluss einer Staffel die letzte heruntergeladene Staffel aktualisieren      
-                        set_last_downloaded_season(db_id, int(season))
-
-
-                    # Nach Abschluss aller Downloads den Status der deutschen Vollständigkeit aktualisieren
-                    allready_missing_german_episodes = get_missing_german_episodes(db_id)
-                    if len(missing_german_episodes) == 0 and (allready_missing_german_episodes is None or len(allready_missing_german_episodes) == 0):
-                        set_deutsch_completion(db_id, True)
-                    else:
-                        set_deutsch_completion(db_id, False)
-                        if allready_missing_german_episodes is not None or len(allready_missing_german_episodes) != 0:
-                            missing_german_episodes = (allready_missing_german_episodes or []) + missing_german_episodes
-                            if missing_german_episodes:
-                                set_missing_german_episodes(db_id, missing_german_episodes)
-            
-                    # Nur als komplett markieren, wenn mindestens eine Episode heruntergeladen wurde
-                    if downloaded_episodes > 0:
-                        set_completion_status(db_id, True)
-                    else:
-                        print(f"[INFO] Keine neuen Episoden heruntergeladen für Series {db_id}. Status wird NICHT auf komplett gesetzt.")
-
-    #================================================
-    #German Mode
-    #================================================
-                            
-                elif mode == "german":
-                    if get_deutsch_completion_status(db_id) is True:
-                        print(f"[SKIP] Serie '{title}' bereits komplett auf Deutsch verfügbar.")
-                        continue           
-                    deutsch = "German Dub"
-                    missing_german_episodes = get_missing_german_episodes(db_id)
-                    if seasons_with_episode_count == -1:
-                        raise Exception("Error retrieving seasons or episodes.")
-                    for season in seasons_with_episode_count:
-                        for episode in seasons_with_episode_count[season]:
-                            episode_url = get_episode_url(serien_url, season, episode)
-                            if episode_url in missing_german_episodes:
-                                sprachen = get_languages_for_episode(episode_url)
-                                if sprachen == -1:
-                                    print(f"[ERROR] Could not retrieve languages for episode: {episode_url}")
-                                    continue
-                                if deutsch not in sprachen:
-                                    print(f"[SKIP] Episode {episode_url} noch nicht auf Deutsch verfügbar.")
-                                    continue
-
-                                cmd = str(f'aniworld --language "{deutsch}" -a Download -o "{DOWNLOAD_PATH}" {episode_url}')
-                                try:
-                                    print(f"\n[OK] Starting download command: {cmd}")
-                                    succes = start_download_process(cmd)
-                                    if succes:
-                                        exsiting_file = get_existing_file_path(serien_url=serien_url, season=season, episode=episode, config=config)
-                                        if exsiting_file is not None:
-                                            exsiting_file = str(exsiting_file)
-                                            if '[Sub]' in exsiting_file or '[English Dub]' in exsiting_file or '[English Sub]' in exsiting_file:
-                                                delete_old_non_german_version(serien_url=serien_url, season=season, episode=episode, config=config)
-
-                                            print(f"[VERIFY] File found: {get_episode_title(episode_url)}")
-                                            move_and_rename_downloaded_file(serien_url=serien_url, season=season, episode=episode, language=deutsch)
-                                            print(f"[OK ] Download successfull for episode {episode_url}")
-                                            missing_german_episodes.remove(episode_url)
-                                        elif existing_file is None:
-                                            print(f"[ERROR] Download failed for episode {episode_url}. No file found after download process.")
-                                            continue
-
-                                except Exception as e:
-                                    print(f"[ERROR] Error during download process: {e}")
-                                    continue
-                                # Aktualisiere die fehlenden deutschen Episoden in der Datenbank
-                                set_missing_german_episodes(db_id, missing_german_episodes)
-                                # Wenn keine fehlenden deutschen Episoden mehr übrig sind, aktualisiere den Status der deutschen Vollständigkeit
-                                if len(missing_german_episodes) == 0 or missing_german_episodes is None:
-                                    set_deutsch_completion(db_id, True)
-
-    #================================================
-    #Check Missing Mode
-    #================================================
-
-                elif mode == "check-missing":
-                    missing_german_episodes = []
-                    seasons_with_episode_count = get_seasons_with_episode_count(serien_url)
-                    if seasons_with_episode_count == -1:
-                        raise Exception("Error retrieving seasons or episodes.")
-        
-                    for season in seasons_with_episode_count:
-                        for episode in seasons_with_episode_count[season]:   
-
-                            existing_file = get_existing_file_path(serien_url=serien_url, season=season, episode=episode, config=config)
-                            if existing_file is not None:
-                                print(f"[SKIP] Datei für S{int(season):02d}E{int(episode):03d} bereits vorhanden.")
-                                existing_file = str(existing_file)
-                                if '[Sub]' in existing_file or '[English Dub]' in existing_file or '[English Sub]' in existing_file:
-                                    missing_german_episodes.append(get_episode_url(serien_url, season, episode))
-                                continue
-                                
-                            episode_url = get_episode_url(serien_url, season, episode)
-                            sprachen = get_languages_for_episode(episode_url)
-                            if sprachen != -1:
-                                if LANGUAGES[0] in sprachen:
-                                    sprache = LANGUAGES[0]
-                                elif LANGUAGES[1] in sprachen:
-                                    sprache = LANGUAGES[1]
-                                elif LANGUAGES[2] in sprachen:
-                                    sprache = LANGUAGES[2]
-                                elif LANGUAGES[3] in sprachen:
-                                    sprache = LANGUAGES[3]
-                                else:
-                                    return -1
-                                if sprache != "German Dub":
-                                        missing_german_episodes.append(episode_url)
-                                cmd = str(f'aniworld --language "{sprache}" -a Download -o "{DOWNLOAD_PATH}" {episode_url}')
-                                try:
-                                    print(f"\n[OK] Starting download command: {cmd}")
-                                    succes = start_download_process(cmd)
-                                    if succes:
-                                        print(f"[OK] Download successfull for S{int(season):02d}E{int(episode):03d}")
-                                except Exception as e:
-                                    print(f"[ERROR] Error during download process: {e}")
-                                    continue 
-                            
-                            else:
-                                print(f"[ERROR] Could not retrieve languages for episode: {episode_url}")
-
-
-                            downloaded_file = find_downloaded_file(season=season, episode=episode, config=config, url=serien_url)
-                            if downloaded_file is None:
-                                print(f"[ERROR] Download failed for S{int(season):02d}E{int(episode):03d}. No file found after download process.")
-                                continue
-
-                            elif downloaded_file is not None:
-                                print(f"[VERIFY] File found: {get_episode_title(episode_url)}")
-                                move_and_rename_downloaded_file(serien_url=serien_url, season=season, episode=episode, language=sprache)
-
-                            # Nach Abschluss des Downloads die letzte heruntergeladene Episode aktualisieren (inklusive Filme in Staffel 0)
-                            if int(season) == 0 or season.strip().lower() == "filme":
-                                set_last_downloaded_film(db_id, int(episode))
-                            set_last_downloaded_episode(db_id, int(season), int(episode))
-
-                        # Nach Abschluss einer Staffel die letzte heruntergeladene Staffel aktualisieren
-                        set_last_downloaded_season(db_id, int(season))
-
-    #================================================
-    #New Mode
-    #================================================
-
-                elif mode == "new":
-                    missing_german_episodes = []
-                    seasons_with_episode_count = get_seasons_with_episode_count(serien_url)
-                    if seasons_with_episode_count == -1:
-                        raise Exception("Error retrieving seasons or episodes.")
-                    # Nur bei kompletten Serien auf neue Episoden prüfen
-                    if get_completion_status(db_id) is False:
-                        print(f"[SKIP] Serie '{title}' noch nicht komplett heruntergeladen. Bitte zuerst im 'default' Modus ausführen.")
-                        continue
-
-                    # Letzte heruntergeladene Werte aus DB holen
-                    last_downloaded_season = get_last_downloaded_season(db_id)
-                    last_downloaded_episode = get_last_downloaded_episode(db_id)
-                    last_downloaded_film = get_last_downloaded_film(db_id)
-
-                    # Letzte verfügbare Werte ermitteln
-                    last_available_season = max(seasons_with_episode_count.keys(), key=int)
-                    if str(last_downloaded_season) in seasons_with_episode_count:
-                        last_available_episode = max(seasons_with_episode_count[str(last_downloaded_season)]) 
-                    else:
-                        last_available_episode = 0
-                    last_available_film = 0
-                    if "0" in seasons_with_episode_count:
-                        last_available_film = max(seasons_with_episode_count["0"])
-                    elif "filme" in seasons_with_episode_count:
-                        last_available_film = max(seasons_with_episode_count["filme"])
-
-                    # Bestimmen was heruntergeladen werden soll
-                    download_seasons = []
-                    
-                    # Neue Staffel(n) gefunden
-                    if int(last_available_season) > last_downloaded_season:
-                        print(f"[INFO] Neue Staffel(n) ab Staffel {last_available_season} gefunden.")
-                        # Alle neuen Staffeln hinzufügen
-                        for staffel in range(last_downloaded_season + 1, int(last_available_season) + 1):
-                            if str(staffel) in seasons_with_episode_count:
-                                download_seasons.append(str(staffel))
-                    
-                    # Neue Episoden in letzter Staffel
-                    elif last_downloaded_season == int(last_available_season) and int(last_available_episode) > last_downloaded_episode:
-                        print(f"[INFO] Neue Episode(n) in Staffel {last_downloaded_season} gefunden ab (E{last_downloaded_episode + 1} ")
-                        download_seasons.append(str(last_downloaded_season))
-                    
-                    # Neue Filme
-                    if int(last_available_film) > last_downloaded_film:
-                        print(f"[INFO] Neuer Film/Filme gefunden (Film {last_downloaded_film + 1} bis {last_available_film}).")
-                        if "0" in seasons_with_episode_count:
-                            download_seasons.append("0")
-                        elif "filme" in seasons_with_episode_count:
-                            download_seasons.append("filme")
-                    
-                    # Warnungen ausgeben
-                    if int(last_available_season) < last_downloaded_season:
-                        print(f"[WARN] Die letzte heruntergeladene Staffel {last_downloaded_season} ist höher als die aktuell verfügbare Staffel {last_available_season}. Bitte überprüfe die Serie manuell.")
-                        continue
-                    if last_downloaded_season == int(last_available_season) and int(last_available_episode) < last_downloaded_episode:
-                        print(f"[WARN] Die letzte heruntergeladene Episode S{int(last_downloaded_season):02d}E{int(last_downloaded_episode):03d} ist höher als die aktuell verfügbare Episode. Bitte überprüfe die Serie manuell.")
-                        continue
-                    
-                    if int(last_available_film) > 0 and int(last_available_film) < last_downloaded_film:
-                        print(f"[WARN] Der letzte heruntergeladene Film S00E{int(last_downloaded_film):03d} ist höher als der aktuell verfügbare Film S00E{int(last_available_film):03d}. Bitte überprüfe die Serie manuell.")
-                        continue
-                    
-                    # Wenn nichts Neues gefunden wurde
-                    if len(download_seasons) == 0:
-                        print(f"[INFO] Keine neuen Episoden oder Filme für '{title}' gefunden.")
-                        continue
-                    
-                    # Nur die relevanten Staffeln herunterladen
-                    for season in download_seasons:
-                        for episode in seasons_with_episode_count[season]:
-                            
-                            if season == str(last_downloaded_season) and int(episode) <= last_downloaded_episode:
-                                continue  # Bereits heruntergeladen
-                            
-                            if (season == "0" or season.lower() == "filme") and int(episode) <= last_downloaded_film:
-                                continue  # Film bereits heruntergeladen
-                            
-                            # Prüfen ob Datei bereits existiert
-                            existing_file = get_existing_file_path(serien_url=serien_url, season=season, episode=episode, config=config)
-                            if existing_file is not None:
-                                print(f"[SKIP] Datei für S{int(season):02d}E{int(episode):03d} bereits vorhanden.")
-                                continue
-                            
-
-                            episode_url = get_episode_url(serien_url, season, episode)
-                            sprachen = get_languages_for_episode(episode_url)
-                            if sprachen != -1:
-                                if LANGUAGES[0] in sprachen:
-                                    sprache = LANGUAGES[0]
-                                elif LANGUAGES[1] in sprachen:
-                                    sprache = LANGUAGES[1]
-                                elif LANGUAGES[2] in sprachen:
-                                    sprache = LANGUAGES[2]
-                                elif LANGUAGES[3] in sprachen:
-                                    sprache = LANGUAGES[3]
-                                else:
-                                    return -1
-                                if sprache != "German Dub":
-                                    missing_german_episodes.append(episode_url)
-                                cmd = str(f'aniworld --language "{sprache}" -a Download -o "{DOWNLOAD_PATH}" {episode_url}')
-                                try:
-                                    print(f"\n[OK] Starting download command: {cmd}")
-                                    succes = start_download_process(cmd)
-                                    if succes:
-                                        print(f"[OK] Download successfull for S{int(season):02d}E{int(episode):03d}")
-                                except Exception as e:
-                                    print(f"[ERROR] Error during download process: {e}")
-                                    continue                         
-                            else:
-                                print(f"[ERROR] Could not retrieve languages for episode: {episode_url}")
-                                continue
-                            
-                            downloaded_file = find_downloaded_file(season=season, episode=episode, config=config, url=serien_url)
-                            if downloaded_file is None:
-                                print(f"[ERROR] Download failed for S{int(season):02d}E{int(episode):03d}. No file found after download process.")
-                                continue
-
-                            elif downloaded_file is not None:
-                                print(f"[VERIFY] File found: {get_episode_title(episode_url)}")
-                                move_and_rename_downloaded_file(serien_url=serien_url, season=season, episode=episode, language=sprache)
-
-                            # Nach Abschluss des Downloads die letzte heruntergeladene Episode aktualisieren
-                            if int(season) == 0 or season.strip().lower() == "filme":
-                                set_last_downloaded_film(db_id, int(episode))
-                            set_last_downloaded_episode(db_id, int(season), int(episode))
-
-                        # Nach Abschluss einer Staffel die letzte heruntergeladene Staffel aktualisieren
-                        set_last_downloaded_season(db_id, int(season))
+                # Status und Fortschritt der Serie einmal laden statt je Spalte eine Abfrage
+                anime_state = get_anime_state(db_id)
+                _MODE_HANDLERS[mode](db_id, title, serien_url, seasons_with_episode_count, anime_state, config)
 
             except Exception as e:
                 print(f"[ERROR] Error processing series with ID {db_id}: {e}")
-            
-            # Nach jeder Serie zum nächsten Index wechseln (WICHTIG: Das muss NACH allen Modi sein!)
-            index += 1
-            if check_index_exist(index):
-                next_index_exist = True
-            else:
-                next_index_exist = False
         
 #================================================
 #Übergang zur nächsten Serie
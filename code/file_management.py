@@ -1,17 +1,24 @@
 from pathlib import Path
+import os
+import errno
+import shutil
+import time
 from typing import Optional
+from functools import lru_cache
+from collections import OrderedDict
 import re
 from html_request import get_episode_title, get_series_title
 from config import load_config
 from url_builder import get_episode_url
-from database import get_folder_name_from_db, set_folder_name_in_db, get_db_id_by_url
+from database import get_folder_name_by_url, ensure_folder_name_by_url
+from helper import is_movie_season
 
 # ============================================================================
 # Dateinamen und Pfade generieren
 # ============================================================================
 
 
-def get_folder_path(staffel: str, url: str) -> str:
+def get_folder_path(staffel: str, url: str, config: dict | None = None) -> str:
     """
         Erhalten des Basisordners für eine Staffel oder einen Film basierend auf der URL und Staffelnummer.
     
@@ -19,10 +26,13 @@ def get_folder_path(staffel: str, url: str) -> str:
     :type staffel: str
     :param url: Description
     :type url: str
+    :param config: Bereits geladene Konfiguration; nur wenn None wird sie erneut geladen
+    :type config: dict | None
     :return: Description
     :rtype: str
     """
-    config = load_config()
+    if config is None:
+        config = load_config()
     if not config:  
         print("Fehler beim Laden der Konfiguration.")
         exit(1)
@@ -38,15 +48,12 @@ def get_folder_path(staffel: str, url: str) -> str:
     DEDICATED_MOVIES_FOLDER = config.get('dedicated_movies_folder')
 
     
-    if STORAGE_MODE == "standard":
-        return DOWNLOAD_PATH
-    
     if STORAGE_MODE == "standard":
         return DOWNLOAD_PATH
 
     elif STORAGE_MODE == "separate":
         if "https://s.to/" in url:
-            if staffel.strip().lower() == "0" or staffel.strip().lower() == "filme":
+            if is_movie_season(staffel):
                 if DEDICATED_MOVIES_FOLDER:
                     return MOVIES_PATH
                 elif SERIEN_SEPARATE_MOVIES:
@@ -57,7 +64,7 @@ def get_folder_path(staffel: str, url: str) -> str:
                 return SERIES_PATH
 
         elif "https://aniworld.to/" in url:
-            if staffel.strip().lower() == "filme" or staffel.strip().lower() == "0":
+            if is_movie_season(staffel):
                 if DEDICATED_MOVIES_FOLDER:  
                     return MOVIES_PATH
                 elif ANIME_SEPARATE_MOVIES:
@@ -86,13 +93,10 @@ def get_existing_file_path(serien_url: str, season: str, episode: str, config) -
     :return: Vollständiger Pfad zur vorhandenen Datei oder None, wenn keine Datei gefunden wurde.
     """
     
-    folder_path = get_folder_path(season, serien_url)
+    folder_path = get_folder_path(season, serien_url, config)
     
     # Versuche zunächst den gespeicherten Ordnernamen aus der DB zu holen
-    db_id = get_db_id_by_url(serien_url)
-    stored_folder_name = None
-    if db_id:
-        stored_folder_name = get_folder_name_from_db(db_id)
+    stored_folder_name = _stored_folder_name(serien_url)
     
     # Falls kein Ordnername gespeichert ist, verwende den Serien-Titel als Fallback
     if not stored_folder_name:
@@ -109,7 +113,7 @@ def get_existing_file_path(serien_url: str, season: str, episode: str, config) -
         print("Fehler beim Laden der Konfiguration.")
         return None
     #Für Filme könnte es je nach Einstellung direkt im Serienordner liegen oder in einem separaten Filme-Ordner. Daher müssen wir beide Möglichkeiten prüfen.
-    if season.strip().lower() == "0" or season.strip().lower() == "filme":
+    if is_movie_season(season):
         if config.get('dedicated_movies_folder') or config.get('serien_separate_movies') or config.get('anime_separate_movies'):
             target_folder = Path(folder_path) / file_name
         else:
@@ -117,25 +121,162 @@ def get_existing_file_path(serien_url: str, season: str, episode: str, config) -
     else:
         target_folder = Path(folder_path) / stored_folder_name / f"Staffel {season}"
     
-    if not target_folder.exists():
+    # Ordner nur einmal einlesen statt für jede Suffix/Endungs-Kombination erneut zu globben
+    try:
+        folder_files = _list_folder_files(target_folder)
+    except (FileNotFoundError, NotADirectoryError):
         return None
     
-    suffixes = ["", "[Sub]", "[English Dub]", "[English Sub]"]
+    suffixes = ("",) + NON_GERMAN_MARKERS
     extensions = [".mkv", ".mp4"]  # mkv zuerst, mp4 als Fallback
     
     for suffix in suffixes:
-    # Suche nach Dateien mit diesem Suffix
+    # Suche nach Dateien mit diesem Suffix (entspricht "*{file_name}*{suffix}*{ext}", aber ohne Glob-Sonderzeichen)
         for ext in extensions:
-            for test_file in target_folder.glob(f"*{file_name}*{suffix}*{ext}"):
-                if test_file.is_file():
-                    return test_file
+            for name in folder_files:
+                if not name.endswith(ext):
+                    continue
+                title_index = name.find(file_name)
+                if title_index != -1 and name.find(suffix, title_index + len(file_name)) != -1:
+                    return target_folder / name
     
     # Keine Datei gefunden
     return None
 
+# Sprachsuffixe im Dateinamen (siehe rename_file_with_title); deutsche Dubs haben keinen Suffix
+_LANGUAGE_SUFFIXES = {
+    "German Dub": "",
+    "German Sub": " [Sub]",
+    "English Dub": " [English Dub]",
+    "English Sub": " [English Sub]"
+}
+NON_GERMAN_MARKERS = ("[Sub]", "[English Dub]", "[English Sub]")
+
+def is_non_german_file(file_path: Path) -> bool:
+    """True, wenn der Dateiname eine nicht-deutsche Fassung markiert."""
+    name = file_path.name
+    return any(marker in name for marker in NON_GERMAN_MARKERS)
+
+# Serien-URL -> gespeicherter Ordnername (folder_name wird nur einmal gesetzt), wird pro Download-Run geleert
+_series_folder_names: dict[str, str] = {}
+
+def _stored_folder_name(serien_url: str) -> str | None:
+    """Gibt den gespeicherten Ordnernamen der Serie zurück; die DB wird pro Serie nur bis zum ersten Treffer gefragt."""
+    folder_name = _series_folder_names.get(serien_url)
+    if folder_name is None:
+        folder_name = get_folder_name_by_url(serien_url)
+        if folder_name:
+            _series_folder_names[serien_url] = folder_name
+    return folder_name
+
+def _ensure_stored_folder_name(serien_url: str, folder_name: str) -> str | None:
+    """Wie ensure_folder_name_by_url, schreibt aber nicht erneut, wenn der Ordnername schon bekannt ist."""
+    stored_folder_name = _series_folder_names.get(serien_url)
+    if stored_folder_name is None:
+        stored_folder_name = ensure_folder_name_by_url(serien_url, folder_name)
+        if stored_folder_name:
+            _series_folder_names[serien_url] = stored_folder_name
+    return stored_folder_name
+
+def clear_folder_name_cache() -> None:
+    """Leert den Ordnernamen-Cache (zu Beginn jedes Download-Runs)."""
+    _series_folder_names.clear()
+
+# Dateinamen je Ordner, gültig solange sich die mtime des Ordners nicht ändert; als LRU begrenzt,
+# damit der Cache im Dauerbetrieb nicht mit jeder Staffel der Bibliothek wächst
+_folder_listing_cache: OrderedDict[str, tuple[int, list[str]]] = OrderedDict()
+_FOLDER_CACHE_MAX_ENTRIES = 512
+# Ordner, die jünger als das sind, nicht cachen (grobe mtime-Auflösung z.B. bei FAT/exFAT)
+_FOLDER_CACHE_MIN_AGE_NS = 2_000_000_000
+
+def _list_folder_files(folder: Path) -> list[str]:
+    """
+    Gibt die (nicht versteckten) Dateinamen eines Ordners zurück.
+    Solange sich die mtime des Ordners nicht ändert, reicht ein stat() statt eines erneuten Einlesens.
+    """
+    key = str(folder)
+    folder_mtime = os.stat(folder).st_mtime_ns
+    cached = _folder_listing_cache.get(key)
+    if cached is not None and cached[0] == folder_mtime:
+        _folder_listing_cache.move_to_end(key)
+        return cached[1]
+    with os.scandir(folder) as entries:
+        folder_files = [entry.name for entry in entries if not entry.name.startswith(".") and entry.is_file()]
+    if time.time_ns() - folder_mtime > _FOLDER_CACHE_MIN_AGE_NS:
+        _folder_listing_cache[key] = (folder_mtime, folder_files)
+        _folder_listing_cache.move_to_end(key)
+        if len(_folder_listing_cache) > _FOLDER_CACHE_MAX_ENTRIES:
+            _folder_listing_cache.popitem(last=False)
+    return folder_files
+
+# Dateinamen nach rename_file_with_title: "S01E005 - Titel [Sub].mkv" bzw. "Film001 - Titel.mkv"
+_RE_EPISODE_FILE = re.compile(r'^(?:S(\d+)E(\d+)|Film(\d+))(?![0-9])')
+
+def _episode_key(season: str, episode: str) -> tuple[int, int]:
+    return (0 if is_movie_season(season) else int(season), int(episode))
+
+def index_existing_episodes(serien_url: str, seasons, config: dict) -> dict[int, dict[int, Path]]:
+    """
+    Liest die Staffel-/Filme-Ordner einer Serie je einmal ein und ordnet die Dateien nach Staffel und Episode zu.
+    Staffeln, deren Dateien nicht über die Nummer auffindbar sind (Filme im separaten Filme-Ordner), fehlen im Index.
+    """
+    stored_folder_name = _stored_folder_name(serien_url) or get_series_title(serien_url)
+    if not stored_folder_name:
+        return {}
+    separate_movies = config.get('dedicated_movies_folder') or config.get('serien_separate_movies') or config.get('anime_separate_movies')
+
+    existing_episodes: dict[int, dict[int, Path]] = {}
+    for season in seasons:
+        if is_movie_season(season):
+            if separate_movies:
+                continue
+            folder = Path(get_folder_path(season, serien_url, config)) / stored_folder_name / "Filme"
+        else:
+            folder = Path(get_folder_path(season, serien_url, config)) / stored_folder_name / f"Staffel {season}"
+        try:
+            folder_files = _list_folder_files(folder)
+        except (FileNotFoundError, NotADirectoryError):
+            folder_files = []
+
+        season_files: dict[int, Path] = {}
+        for name in folder_files:
+            if not name.endswith((".mkv", ".mp4")):
+                continue
+            match = _RE_EPISODE_FILE.match(name)
+            if match is None:
+                continue
+            episode_number = int(match[2] or match[3])
+            # mkv hat wie in get_existing_file_path Vorrang vor mp4
+            if episode_number not in season_files or (name.endswith(".mkv") and season_files[episode_number].suffix != ".mkv"):
+                season_files[episode_number] = folder / name
+        existing_episodes[_episode_key(season, "0")[0]] = season_files
+    return existing_episodes
+
+def has_indexed_episode(existing_episodes: dict[int, dict[int, Path]], season: str, episode: str) -> bool:
+    """True, wenn die Episode bereits im Index gefunden wurde."""
+    season_key, episode_key = _episode_key(season, episode)
+    return episode_key in existing_episodes.get(season_key, {})
+
+def find_existing_episode(existing_episodes: dict[int, dict[int, Path]], serien_url: str, season: str, episode: str, config: dict) -> Optional[Path]:
+    """Schlägt eine Episode im Index nach; nicht indizierte Staffeln werden wie bisher per get_existing_file_path gesucht."""
+    season_key, episode_key = _episode_key(season, episode)
+    season_files = existing_episodes.get(season_key)
+    if season_files is None:
+        return get_existing_file_path(serien_url, season, episode, config)
+    return season_files.get(episode_key)
+
+def record_indexed_episode(existing_episodes: dict[int, dict[int, Path]], season: str, episode: str, file_path: Optional[Path]) -> None:
+    """Trägt eine gerade verschobene Datei in den Index ein, damit er ohne erneuten Scan aktuell bleibt."""
+    if file_path is None:
+        return
+    season_key, episode_key = _episode_key(season, episode)
+    season_files = existing_episodes.get(season_key)
+    if season_files is not None:
+        season_files[episode_key] = file_path
+
 def get_file_name(serien_url: str, season: str, episode: str):
 
-    if season.strip().lower() == "0" or season.strip().lower() == "filme":
+    if is_movie_season(season):
         config = load_config()
         if not config:
             print("Fehler beim Laden der Konfiguration.")
@@ -177,7 +318,6 @@ def find_downloaded_file(season: str, episode: str, config: dict, url: str) -> O
             print("Fehler beim Laden der Konfiguration.")
             return None
         
-    titel = get_series_title(url)
     download_path = config.get('download_path')
     if not download_path:
         print("[ERROR] Download-Pfad nicht in der Konfiguration gefunden.")
@@ -189,44 +329,83 @@ def find_downloaded_file(season: str, episode: str, config: dict, url: str) -> O
         return None
     
     # Bestimme das Such-Muster (S01E05 oder Film001)
-    if season.strip().lower() == "0" or season.strip().lower() == "filme":
+    if is_movie_season(season):
         prefix = f"Movie{int(episode):03d}"
     else:
         prefix = f"S{int(season):02d}E{int(episode):03d}"
     
+    # Ein kompiliertes Muster für beide Endungen statt je einem Glob pro Endung
+    prefix_pattern = _episode_file_pattern(prefix)
+
     # Suche zuerst direkt im Download-Pfad (mkv zuerst, dann mp4)
-    for ext in [".mkv", ".mp4"]:
-        for file in download_path_obj.glob(f"*{prefix}*{ext}"):
-            if file.is_file():
+    file = _find_file_with_prefix(download_path_obj, prefix_pattern)
+    if file is not None:
+        return file
+
+    # Dann im bereits bekannten Serienordner aus der DB, ohne den Serien-Titel online abzufragen
+    stored_folder_name = _stored_folder_name(url)
+    if stored_folder_name:
+        stored_folder = download_path_obj / stored_folder_name
+        if stored_folder.is_dir():
+            file = _find_file_with_prefix(stored_folder, prefix_pattern)
+            if file is not None:
                 return file
+
+    titel = get_series_title(url)
     if titel is None:
         print(f"[ERROR] Konnte Serien-Titel nicht abrufen für URL: {url}")
         return None
     
     # Suche nach Ordner mit neuem aniworld-cli Format: "Titel (Jahr) [IMDB-Nummer]"
-    # Regex-Pattern: Titel gefolgt von optionalem (Jahr) und [IMDB-ID]
-    escaped_titel = re.escape(titel)
-    pattern = re.compile(rf"^{escaped_titel}(\s*\(\d{{4}}\))?(\s*\[tt\d+\])?$", re.IGNORECASE)
-    
-    for folder in download_path_obj.iterdir():
-        if folder.is_dir():
-            # Prüfe ob Ordnername dem neuen Format entspricht
-            if pattern.match(folder.name) or folder.name == titel:
-                for ext in [".mkv", ".mp4"]:
-                    for file in folder.glob(f"*{prefix}*{ext}"):
-                        if file.is_file():
-                            return file
+    pattern = _series_folder_pattern(titel)
+    
+    with os.scandir(download_path_obj) as entries:
+        # Erst den Namen prüfen, is_dir() nur für passende Einträge
+        matching_folders = [
+            download_path_obj / entry.name for entry in entries
+            if (pattern.match(entry.name) or entry.name == titel) and entry.is_dir()
+        ]
+    for folder in matching_folders:
+        file = _find_file_with_prefix(folder, prefix_pattern)
+        if file is not None:
+            return file
     
     # Falls nicht gefunden, suche im einfachen Serien-Titel-Unterordner (Legacy)
     serie_folder = Path(Path(download_path_obj) / Path(titel))
     if serie_folder.exists():
-        for ext in [".mkv", ".mp4"]:
-            for file in serie_folder.glob(f"*{prefix}*{ext}"):
-                if file.is_file():
-                    return file
+        return _find_file_with_prefix(serie_folder, prefix_pattern)
     
     return None
 
+@lru_cache(maxsize=256)
+def _series_folder_pattern(titel: str) -> re.Pattern:
+    """Kompiliertes Muster für den Serienordner: Titel gefolgt von optionalem (Jahr) und [IMDB-ID]."""
+    return re.compile(rf"^{re.escape(titel)}(\s*\(\d{{4}}\))?(\s*\[tt\d+\])?$", re.IGNORECASE)
+
+@lru_cache(maxsize=256)
+def _episode_file_pattern(prefix: str) -> re.Pattern:
+    """
+    Kompiliertes Muster für "*{prefix}*.mkv|mp4". Auf das Präfix darf keine weitere Ziffer folgen,
+    damit z.B. "S01E001" nicht auf "S01E0010" passt.
+    """
+    return re.compile(rf"{re.escape(prefix)}(?![0-9]).*(\.mkv|\.mp4)$")
+
+def _find_file_with_prefix(folder: Path, prefix_pattern: re.Pattern) -> Optional[Path]:
+    """Sucht in einem Durchlauf nach "*{prefix}*.mkv" und fällt sonst auf "*{prefix}*.mp4" zurück."""
+    mp4_file = None
+    # scandir liefert den Dateityp meist schon aus dem Verzeichniseintrag, ohne stat() und Path pro Eintrag
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            match = prefix_pattern.search(entry.name)
+            if match and entry.is_file():
+                if match[1] == ".mkv":
+                    return folder / entry.name
+                if mp4_file is None:
+                    mp4_file = folder / entry.name
+    return mp4_file
+
 def move_downloaded_file(serien_url: str, season: str, episode: str, config: dict) -> Optional[Path]:
     # Konfiguration laden falls nicht übergeben
     if config is None:
@@ -254,29 +433,20 @@ def move_downloaded_file(serien_url: str, season: str, episode: str, config: dic
     # Prüfe ob der Ordnername dem aniworld-cli Format entspricht (Titel mit Jahr/IMDB)
     # und nicht der Download-Root-Ordner ist
     if source_file.parent != download_path:
-        # Ermittle DB-ID und prüfe ob folder_name bereits gespeichert ist
-        db_id = get_db_id_by_url(serien_url)
-        if db_id:
-            stored_folder_name = get_folder_name_from_db(db_id)
-            if not stored_folder_name:
-                # Speichere den gefundenen Ordnernamen in der Datenbank
-                set_folder_name_in_db(db_id, source_folder_name)
-                print(f"[DB] Ordnername gespeichert: {source_folder_name}")
-                stored_folder_name = source_folder_name
-        else:
-            stored_folder_name = source_folder_name
+        # Gefundenen Ordnernamen speichern, falls noch keiner in der DB steht (ein Statement)
+        stored_folder_name = _ensure_stored_folder_name(serien_url, source_folder_name) or source_folder_name
     else:
-        # Datei liegt direkt im Download-Ordner, verwende Serien-Titel
-        stored_folder_name = get_series_title(serien_url)
+        # Datei liegt direkt im Download-Ordner: gespeicherten Ordnernamen verwenden, sonst den Serien-Titel
+        stored_folder_name = _stored_folder_name(serien_url) or get_series_title(serien_url)
     
     # Bestimme den Zielordner
-    folder_path = get_folder_path(season, serien_url)
+    folder_path = get_folder_path(season, serien_url, config)
     
     if not stored_folder_name:
         print("[ERROR] Konnte Ordnernamen nicht ermitteln")
         return None
     
-    if season.strip().lower() == "0" or season.strip().lower() == "filme":
+    if is_movie_season(season):
         if config.get('dedicated_movies_folder') or config.get('serien_separate_movies') or config.get('anime_separate_movies'):
             target_folder = Path(folder_path)
         else:
@@ -291,7 +461,7 @@ def move_downloaded_file(serien_url: str, season: str, episode: str, config: dic
     
     # Verschiebe die Datei
     try:
-        source_file.rename(destination)
+        replace_or_move(source_file, destination)
         print(f"[OK] Verschoben: {source_file.name} → {target_folder}")
         return destination
     except Exception as e:
@@ -312,14 +482,9 @@ def rename_file_with_title(file_path: Path, serien_url: str, season: str, episod
         return None
     
     # Bestimme den Sprachsuffix
-    language_suffix = {
-        "German Dub": "",
-        "German Sub": " [Sub]",
-        "English Dub": " [English Dub]",
-        "English Sub": " [English Sub]"
-    }.get(language, "")
-    
-    if season.strip().lower() == "0" or season.strip().lower() == "filme":
+    language_suffix = _LANGUAGE_SUFFIXES.get(language, "")
+    
+    if is_movie_season(season):
         # Film
         base_name = f"Film{int(episode):03d}"
     else:
@@ -366,7 +531,7 @@ def move_and_rename_downloaded_file(serien_url: str, season: str, episode: str,
     return final_file
 
 
-def delete_old_non_german_version(serien_url: str, season: str, episode: str, config: dict) -> bool:
+def delete_old_non_german_version(serien_url: str, season: str, episode: str, config: dict, file_path: Optional[Path] = None) -> bool:
     """
     Löscht alte nicht-deutsche Versionen einer Episode.
     
@@ -374,8 +539,10 @@ def delete_old_non_german_version(serien_url: str, season: str, episode: str, co
         serien_url: URL zur Serie/zum Anime
         season: Staffelnummer
         episode: Episodennummer
+        file_path: Bereits gefundene Datei; nur wenn None wird der Ordner erneut durchsucht
     """
-    file_path = get_existing_file_path(serien_url, season, episode, config)
+    if file_path is None:
+        file_path = get_existing_file_path(serien_url, season, episode, config)
     if file_path is None:
         print(f"[WARN] Keine vorhandene Datei gefunden für Season {season}, Episode {episode}")
         return False
@@ -390,6 +557,19 @@ def delete_old_non_german_version(serien_url: str, season: str, episode: str, co
     return False
 
 
+def replace_or_move(source: Path, destination: Path) -> None:
+    """
+    Verschiebt eine Datei per os.replace (ein atomarer Syscall auf demselben Laufwerk).
+    Nur wenn Quelle und Ziel auf verschiedenen Laufwerken liegen, wird mit shutil.move kopiert.
+    """
+    try:
+        os.replace(source, destination)
+    except OSError as error:
+        if error.errno != errno.EXDEV:
+            raise
+        shutil.move(str(source), str(destination))
+
+
 def move_file(source: Path, destination: Path) -> bool:
     """
     Verschiebt eine Datei sicher von Quelle zu Ziel.
@@ -406,7 +586,7 @@ def move_file(source: Path, destination: Path) -> bool:
         destination.parent.mkdir(parents=True, exist_ok=True)
         
         # Verschiebe die Datei
-        source.rename(destination)
+        replace_or_move(source, destination)
         print(f"✓ Verschoben: {source.name} → {destination}")
         return True
     except Exception as e:
@@ -1,5 +1,13 @@
 import re
 
+# Unzulässige Windows-Zeichen: < > : " / \ | ? *
+_RE_INVALID_CHARS = re.compile(r'[<>:"/\\|?*]')
+# "Movie", "[Movie]" oder "The Movie" (case-insensitive) in einem Durchlauf
+_RE_MOVIE = re.compile(r'\s*\[?(?:The\s+)?Movie\]?\s*', re.IGNORECASE)
+_RE_WHITESPACE = re.compile(r'\s+')
+# Staffel-/Film-Pfad einer Episoden-URL (alles ab /staffel-... oder /filme...)
+_RE_URL_SEASON_PART = re.compile(r"/(staffel-\d+.*|filme.*)")
+
 def sanitize_title(name: str) -> str:
     """
     Bereinigt einen Titel für die Verwendung als Ordner- oder Dateiname.
@@ -20,7 +28,7 @@ def sanitize_title(name: str) -> str:
         'NarutoShippuden'
     """
     # Entferne unzulässige Windows-Zeichen: < > : " / \ | ? *
-    name = re.sub(r'[<>:"/\\|?*]', '', name)
+    name = _RE_INVALID_CHARS.sub('', name)
     
     # Entferne führende/abschließende Leerzeichen
     name = name.strip()
@@ -50,15 +58,25 @@ def sanitize_episode_title(name: str) -> str:
     name = sanitize_title(name)
     
     # Entferne "Movie", "[Movie]" oder "The Movie" (case-insensitive)
-    name = re.sub(r'\s*\[?The\s+Movie\]?\s*', '', name, flags=re.IGNORECASE)
-    name = re.sub(r'\s*\[?Movie\]?\s*', '', name, flags=re.IGNORECASE)
+    name = _RE_MOVIE.sub('', name)
     
     # Entferne mehrfache Leerzeichen und trimme erneut
-    name = re.sub(r'\s+', ' ', name).strip()
+    name = _RE_WHITESPACE.sub(' ', name).strip()
     
     return name
 
 def sanitize_url(url):
     # Entferne alles ab /staffel-... oder /filme...
-    url = re.sub(r"/(staffel-\d+.*|filme.*)", "", url)
-    return url
\ No newline at end of file
+    # Reine Serien-URLs (der Normalfall) per Teilstring-Test erkennen und die Regex überspringen
+    if "/staffel-" not in url and "/filme" not in url:
+        return url
+    url = _RE_URL_SEASON_PART.sub("", url)
+    return url
+
+def is_movie_season(season: str) -> bool:
+    """Gibt True zurück, wenn die Staffel die Filme meint ("0" oder "filme")."""
+    return season.strip().lower() in ("0", "filme")
+
+def season_number(season: str) -> int:
+    """Staffelnummer als Zahl; Filme ("0" bei s.to, "filme" bei aniworld) zählen als Staffel 0."""
+    return 0 if is_movie_season(season) else int(season)
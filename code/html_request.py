@@ -1,54 +1,165 @@
-from typing import List, Dict
+from typing import List, Dict, Tuple
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 import re
 from bs4 import BeautifulSoup
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
 from url_builder import get_season_url
 from helper import sanitize_episode_title, sanitize_title
-from urllib.parse import urlparse
-import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import time
 
 headers = {"User-Agent": "Mozilla/5.0 (compatible; AniLoaderBot/1.0)"}
 
+# Vorkompilierte Muster für s.to-Episodentitel ("S01E02: Deutscher Titel (English Title)")
+_RE_EPISODE_PREFIX = re.compile(r'^S\d{2}E\d{2}:\s*')
+_RE_TRAILING_PARENS = re.compile(r'\s*\([^)]*\)\s*$')
+_RE_PARENS_CONTENT = re.compile(r'\(([^)]*)\)')
+
+# Flaggen-Namen der Seiten (kleingeschrieben) -> Sprachbezeichnung wie in config.json
+_STO_LANGUAGES = {
+    "german": "German Dub",
+    "english": "English Dub",
+    "english-german": "German Sub",
+}
+_ANIWORLD_LANGUAGES = {
+    "german": "German Dub",
+    "english": "English Dub",
+    "japanese-german": "German Sub",
+    "japanese-english": "English Sub",
+}
+
+# Eigene Session für DNS-over-HTTPS, damit die Verbindung zu 1.1.1.1 offen bleibt
+_doh_session = requests.Session()
+_doh_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
 # Cloudflare DNS-over-HTTPS Resolver
+_DNS_RECORD_TYPES = {"A": 1, "AAAA": 28}
+
+def _query_cloudflare_doh(hostname: str, record_type: str) -> List[str]:
+    """Fragt einen Record-Typ bei 1.1.1.1 ab und gibt nur die passenden Adressen zurück (keine CNAMEs)."""
+    doh_url = "https://1.1.1.1/dns-query"
+    params = {"name": hostname, "type": record_type}
+    doh_headers = {"accept": "application/dns-json"}
+
+    response = _doh_session.get(doh_url, params=params, headers=doh_headers, timeout=5)
+    response.raise_for_status()
+    data = response.json()
+    return [answer["data"] for answer in data.get("Answer", []) if answer.get("type") == _DNS_RECORD_TYPES[record_type]]
+
 def resolve_dns_via_cloudflare(hostname: str) -> str:
     """
     Löst einen Hostnamen über Cloudflare DNS (1.1.1.1) mit DNS-over-HTTPS auf.
+    A- und AAAA-Abfrage laufen parallel; IPv4 wird bevorzugt, IPv6 dient als Rückfall.
     
     :param hostname: Der aufzulösende Hostname
     :return: Die aufgelöste IP-Adresse oder der ursprüngliche Hostname bei Fehler
     """
-    try:
-        doh_url = "https://1.1.1.1/dns-query"
-        params = {"name": hostname, "type": "A"}
-        doh_headers = {"accept": "application/dns-json"}
-        
-        response = requests.get(doh_url, params=params, headers=doh_headers, timeout=5)
-        response.raise_for_status()
-        data = response.json()
-        
-        if "Answer" in data and len(data["Answer"]) > 0:
-            ip = data["Answer"][0]["data"]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = {record_type: executor.submit(_query_cloudflare_doh, hostname, record_type) for record_type in ("A", "AAAA")}
+    errors = []
+    for record_type, future in futures.items():
+        try:
+            addresses = future.result()
+        except Exception as e:
+            errors.append(f"{record_type}: {e}")
+            continue
+        if addresses:
+            ip = addresses[0]
             print(f"[DNS] {hostname} → {ip} (via Cloudflare 1.1.1.1)")
             return ip
-    except Exception as e:
-        print(f"[DNS-WARNING] Cloudflare DNS fehlgeschlagen für {hostname}: {e}, verwende System-DNS")
+    if errors:
+        print(f"[DNS-WARNING] Cloudflare DNS fehlgeschlagen für {hostname}: {'; '.join(errors)}, verwende System-DNS")
     
     return hostname
 
 # Session mit Cloudflare DNS
-dns_cache: Dict[str, str] = {}
-_original_getaddrinfo = socket.getaddrinfo
+# Hostname -> (IP, Ablaufzeit per time.monotonic()); fehlgeschlagene Auflösungen werden kürzer gemerkt
+DNS_CACHE_TTL = 900
+DNS_FAILURE_TTL = 60
+dns_cache: Dict[str, Tuple[str, float]] = {}
+_dns_cache_lock = threading.Lock()
+
+def resolve_cached(hostname: str) -> str:
+    """Gibt die IP aus dem DNS-Cache zurück und löst nur bei fehlendem oder abgelaufenem Eintrag neu auf."""
+    cached = dns_cache.get(hostname)
+    if cached is not None and cached[1] > time.monotonic():
+        return cached[0]
+    with _dns_cache_lock:
+        # Ein anderer Thread hat den Eintrag evtl. schon erneuert, während wir gewartet haben
+        cached = dns_cache.get(hostname)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+        ip = resolve_dns_via_cloudflare(hostname)
+        ttl = DNS_CACHE_TTL if ip != hostname else DNS_FAILURE_TTL
+        dns_cache[hostname] = (ip, time.monotonic() + ttl)
+        return ip
+
+class _CloudflareDNSMixin:
+    """
+    Verbindet zur per DoH aufgelösten IP statt socket.getaddrinfo global zu patchen.
+    Host-Header (und bei HTTPS SNI/Zertifikatsprüfung) nutzen weiter den ursprünglichen Hostnamen.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._original_host = self.host
+
+    def _new_conn(self):
+        # Bei jedem (Neu-)Verbindungsaufbau auflösen, damit abgelaufene Cache-Einträge erneuert werden
+        self._dns_host = resolve_cached(self._original_host)
+        return super()._new_conn()
 
-def patched_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):  
-    """Patched getaddrinfo, der DNS-Cache nutzt"""
-    if host in dns_cache:
-        resolved_ip = dns_cache[host]
-        print(f"[DNS] Using cached IP for {host}: {resolved_ip}")
-        return _original_getaddrinfo(resolved_ip, port, family, type, proto, flags)
-    return _original_getaddrinfo(host, port, family, type, proto, flags)
+    def putrequest(self, method, url, skip_host=False, skip_accept_encoding=False):
+        super().putrequest(method, url, skip_host=True, skip_accept_encoding=skip_accept_encoding)
+        if not skip_host:
+            if self.port is None or self.port == self.default_port:
+                self.putheader("Host", self._original_host)
+            else:
+                self.putheader("Host", f"{self._original_host}:{self.port}")
+
+
+class _CloudflareHTTPConnection(_CloudflareDNSMixin, HTTPConnection):
+    pass
+
+
+class _CloudflareHTTPSConnection(_CloudflareDNSMixin, HTTPSConnection):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.server_hostname is None:
+            self.server_hostname = self._original_host
+
+
+class _CloudflareHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _CloudflareHTTPConnection
+
+
+class _CloudflareHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _CloudflareHTTPSConnection
 
-# Patch socket.getaddrinfo
-socket.getaddrinfo = patched_getaddrinfo
+
+class CloudflareAdapter(HTTPAdapter):
+    """HTTPAdapter, dessen Verbindungen die IP aus dem Cloudflare-DNS-Cache nutzen (ohne globalen getaddrinfo-Patch)."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        # Eigenes Dict zuweisen, das modulweite pool_classes_by_scheme von urllib3 bleibt unverändert
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _CloudflareHTTPConnectionPool,
+            "https": _CloudflareHTTPSConnectionPool,
+        }
 
 class CloudflareSession(requests.Session):
     """Session die DNS-Abfragen über Cloudflare 1.1.1.1 routet"""
@@ -56,19 +167,11 @@ class CloudflareSession(requests.Session):
     def __init__(self):
         super().__init__()
         self.headers.update(headers)
-    
-    def request(self, method, url, **kwargs):
-        """Override request um Cloudflare DNS zu verwenden"""
-        parsed = urlparse(url)
-        hostname = parsed.hostname
-
-        if hostname and hostname not in dns_cache:
-            # DNS über Cloudflare auflösen und cachen
-            ip = resolve_dns_via_cloudflare(hostname)
-            if ip != hostname:
-                dns_cache[hostname] = ip
-
-        return super().request(method, url, **kwargs)
+        # Verbindungen zu aniworld.to / s.to wiederverwenden (Keep-Alive statt neuem TLS-Handshake)
+        retries = Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+        adapter = CloudflareAdapter(pool_connections=16, pool_maxsize=32, max_retries=retries)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
 
 # Globale Session mit Cloudflare DNS
 cloudflare_session = CloudflareSession()
@@ -77,7 +180,7 @@ def get_season_numbers(url: str):
     season_numbers: List[str] = []
     serien_html = cloudflare_session.get(url, timeout=5)
     serien_html.raise_for_status()
-    soup = BeautifulSoup(serien_html.text, "html.parser")
+    soup = BeautifulSoup(serien_html.content, HTML_PARSER)
     if "https://s.to/" in url:
         nav = soup.find("nav", id="season-nav")
         scope = nav if nav is not None else soup
@@ -97,6 +200,8 @@ def get_season_numbers(url: str):
 
     return season_numbers
 
+SEASON_FETCH_WORKERS = 4
+
 def get_seasons_with_episode_count(url: str):
     """
     Docstring for get_seasons_with_episode_count
@@ -113,11 +218,18 @@ def get_seasons_with_episode_count(url: str):
         print(f"[ERROR] Keine Staffeln gefunden für {url}")
         return -1
     
-    for staffel in staffeln:
-        staffel_url = get_season_url(url, staffel)
-        staffel_html = cloudflare_session.get(staffel_url, timeout=5)
+    def fetch(staffel):
+        staffel_html = cloudflare_session.get(get_season_url(url, staffel), timeout=5)
         staffel_html.raise_for_status()
-        soup = BeautifulSoup(staffel_html.text, "html.parser")
+        return staffel_html.content
+
+    # Staffelseiten parallel über die gemeinsame Keep-Alive-Session laden; map() liefert sie in
+    # Staffel-Reihenfolge und wirft den ersten Fehler wie zuvor beim sequentiellen Abruf
+    with ThreadPoolExecutor(max_workers=SEASON_FETCH_WORKERS) as executor:
+        staffel_pages = list(executor.map(fetch, staffeln))
+
+    for staffel, staffel_content in zip(staffeln, staffel_pages):
+        soup = BeautifulSoup(staffel_content, HTML_PARSER)
         episodes: List[str] = []
 
         if "https://s.to/" in url:
@@ -162,6 +274,12 @@ def get_seasons_with_episode_count(url: str):
 # Sprachinformationen 
 # ===============================
 
+# Caches pro Download-Run (werden zu Beginn jedes Runs geleert):
+# (Episoden-URL, english_title) -> Titel und Episoden-URL -> verfügbare Sprachen
+_episode_title_cache: Dict[Tuple[str, bool], str] = {}
+_episode_language_cache: Dict[str, List[str]] = {}
+EPISODE_PREFETCH_WORKERS = 8
+
 def get_language_from_sto(soup) -> List[str]:
     sprachen: List[str] = []
     vorhandene_sprachen: List[str] = []
@@ -175,14 +293,7 @@ def get_language_from_sto(soup) -> List[str]:
         if sprache in vorhandene_sprachen or not sprache:
             continue
         vorhandene_sprachen.append(sprache)
-        if sprache.lower() == "german":
-            sprachen.append("German Dub")
-        elif sprache.lower() == "english":
-            sprachen.append("English Dub")
-        elif sprache.lower() == "english-german":
-            sprachen.append("German Sub")
-        else:
-            sprachen.append(sprache)
+        sprachen.append(_STO_LANGUAGES.get(sprache.lower(), sprache))
     
     return sprachen
 
@@ -196,31 +307,28 @@ def get_language_from_aniworld(soup) -> List[str]:
             if sprache in vorhandene_sprachen or not sprache:
                 continue
             vorhandene_sprachen.append(sprache)
-            if sprache.lower() == "german":
-                sprache = "German Dub"
-            elif sprache.lower() == "english":
-                sprache = "English Dub"
-            elif sprache.lower() == "japanese-german":
-                sprache = "German Sub"
-            elif sprache.lower() == "japanese-english":
-                sprache = "English Sub"
-            sprachen.append(sprache)    
+            sprachen.append(_ANIWORLD_LANGUAGES.get(sprache.lower(), sprache))
     return sprachen
 
-def get_languages_for_episode(episode_url: str):
-    episode_html = cloudflare_session.get(episode_url, timeout=5)
-    episode_html.raise_for_status()
-    soup = BeautifulSoup(episode_html.text, "html.parser")
-
-
-    
+def _parse_languages(episode_url: str, content: bytes):
+    soup = BeautifulSoup(content, HTML_PARSER)
     if "https://s.to/" in episode_url:
-        sprachen = get_language_from_sto(soup)
-
+        return get_language_from_sto(soup)
     elif "https://aniworld.to/" in episode_url:
-        sprachen = get_language_from_aniworld(soup)
-    else:
+        return get_language_from_aniworld(soup)
+    return -1
+
+def get_languages_for_episode(episode_url: str):
+    """Gibt die verfügbaren Sprachen zurück; bereits (vor)geladene Episoden kommen aus dem Cache des Runs."""
+    if episode_url in _episode_language_cache:
+        return _episode_language_cache[episode_url]
+    if "https://s.to/" not in episode_url and "https://aniworld.to/" not in episode_url:
         return -1
+    episode_html = cloudflare_session.get(episode_url, timeout=5)
+    episode_html.raise_for_status()
+    sprachen = _parse_languages(episode_url, episode_html.content)
+    if sprachen:
+        _episode_language_cache[episode_url] = sprachen
     return sprachen
 
 
@@ -228,65 +336,125 @@ def get_languages_for_episode(episode_url: str):
 # Titelinformationen
 # ===============================
 
+
+_SERIES_TITLE_SELECTORS = ("div.series-title h1 span", "div.series-title h1", "h1.h2.mb-1.fw-bold")
+
+def _select_first_text(content: bytes, selectors: tuple, strip: bool = False) -> str | None:
+    """
+    Gibt den Text des ersten Elements zurück, das auf einen der CSS-Selektoren passt.
+    Nutzt selectolax, falls installiert (kein kompletter Soup-Baum nötig), sonst BeautifulSoup.
+    """
+    if LexborHTMLParser is not None:
+        tree = LexborHTMLParser(content)
+        for selector in selectors:
+            node = tree.css_first(selector)
+            if node is not None:
+                return node.text(strip=strip)
+        return None
+    soup = BeautifulSoup(content, HTML_PARSER)
+    for selector in selectors:
+        node = soup.select_one(selector)
+        if node is not None:
+            return node.get_text(strip=strip)
+    return None
+
+# Serien-URL -> Titel; nur erfolgreiche Abrufe, damit ein Fehler beim nächsten Aufruf erneut versucht wird
+_series_title_cache: Dict[str, str] = {}
+
 def get_series_title(url):
+    cached = _series_title_cache.get(url)
+    if cached is not None:
+        return cached
     try:
 
         staffel_html = cloudflare_session.get(url, timeout=10)
         staffel_html.raise_for_status()
-        soup = BeautifulSoup(staffel_html.text, "html.parser")
-        title_elem = (
-            soup.select_one("div.series-title h1 span")
-            or soup.select_one("div.series-title h1")
-            or soup.select_one("h1.h2.mb-1.fw-bold")
-        )
-        if title_elem and title_elem.text and title_elem.text.strip():
-            title = sanitize_title(str(title_elem.text.strip()))
+        title_text = _select_first_text(staffel_html.content, _SERIES_TITLE_SELECTORS)
+        if title_text and title_text.strip():
+            title = sanitize_title(title_text.strip())
+            _series_title_cache[url] = title
             return title
     except Exception as e:
         print(f"[FEHLER] Konnte Serien-Titel nicht abrufen ({url}): {e}")
 
-def get_episode_title_from_sto(soup, english_title: bool = False):
-        title_tag = soup.find("h2", class_="h4 mb-1")
-        if title_tag:
-            title_element  = title_tag.get_text(strip=True)
-            cleaned = re.sub(r'^S\d{2}E\d{2}:\s*', '', title_element)
-            if english_title is False:
-                cleaned = re.sub(r'\s*\([^)]*\)\s*$', '', cleaned)
-                title = sanitize_episode_title(cleaned)
-                return title
-            elif english_title is True:
-                # Extrahiere nur Text innerhalb der Klammern
-                match = re.search(r'\(([^)]*)\)', cleaned)
-                if match:
-                    cleaned = match.group(1)
-                title = sanitize_episode_title(cleaned)
-                return title
-            else:
-                return None
-
-def get_episode_title_from_aniworld(soup, english_title: bool = False):
+def get_episode_title_from_sto(title_element: str, english_title: bool = False):
+    cleaned = _RE_EPISODE_PREFIX.sub('', title_element)
+    # Klammer-Regexe nur anwenden, wenn der Titel überhaupt Klammern enthält
     if english_title is False:
-        title_tag = soup.find("span", class_="episodeGermanTitle")
-        if title_tag:
-            title = sanitize_episode_title(title_tag.get_text(strip=True))
-            return title
+        if ")" in cleaned:
+            cleaned = _RE_TRAILING_PARENS.sub('', cleaned)
+        title = sanitize_episode_title(cleaned)
+        return title
     elif english_title is True:
-        title_tag = soup.find("small", class_="episodeEnglishTitle")
-        if title_tag:
-            title = sanitize_episode_title(title_tag.get_text(strip=True))
-            return title
+        # Extrahiere nur Text innerhalb der Klammern
+        match = _RE_PARENS_CONTENT.search(cleaned) if "(" in cleaned else None
+        if match:
+            cleaned = match.group(1)
+        title = sanitize_episode_title(cleaned)
+        return title
     else:
         return None
 
 def get_episode_title(episode_url: str, english_title: bool = False):
+    """Gibt den Episodentitel zurück; erfolgreich abgerufene Titel werden für den laufenden Run gemerkt."""
+    key = (episode_url, english_title)
+    if key in _episode_title_cache:
+        return _episode_title_cache[key]
+    title = _fetch_episode_title(episode_url, english_title)
+    if title:
+        _episode_title_cache[key] = title
+    return title
+
+def prefetch_episodes(episode_urls: List[str], english_title: bool = False) -> None:
+    """
+    Lädt Titel und Sprachen mehrerer Episoden parallel über die gemeinsame Session in die Caches.
+    Jede Episodenseite wird dabei nur einmal abgerufen.
+    """
+    missing_urls = [
+        url for url in dict.fromkeys(episode_urls)
+        if (url, english_title) not in _episode_title_cache or url not in _episode_language_cache
+    ]
+    if not missing_urls:
+        return
+
+    def fetch(episode_url):
+        try:
+            episode_html = cloudflare_session.get(episode_url, timeout=5)
+            episode_html.raise_for_status()
+            title = _parse_episode_title(episode_url, episode_html.content, english_title)
+            if title:
+                _episode_title_cache[(episode_url, english_title)] = title
+            sprachen = _parse_languages(episode_url, episode_html.content)
+            if sprachen and sprachen != -1:
+                _episode_language_cache[episode_url] = sprachen
+        except Exception:
+            pass  # Fehler tauchen beim eigentlichen Abruf der Episode erneut auf
+
+    with ThreadPoolExecutor(max_workers=EPISODE_PREFETCH_WORKERS) as executor:
+        list(executor.map(fetch, missing_urls))
+
+def clear_episode_caches() -> None:
+    """Leert Serientitel-, Episodentitel- und Sprach-Cache (zu Beginn jedes Download-Runs)."""
+    _series_title_cache.clear()
+    _episode_title_cache.clear()
+    _episode_language_cache.clear()
+
+def _fetch_episode_title(episode_url: str, english_title: bool = False):
     episode_html = cloudflare_session.get(episode_url, timeout=5)
     episode_html.raise_for_status()
-    soup = BeautifulSoup(episode_html.text, "html.parser")
+    return _parse_episode_title(episode_url, episode_html.content, english_title)
+
+def _parse_episode_title(episode_url: str, content: bytes, english_title: bool = False):
     title = None
     if "https://s.to/" in episode_url:
-        title = get_episode_title_from_sto(soup, english_title)
+        title_element = _select_first_text(content, ("h2.h4.mb-1",), strip=True)
+        if title_element is not None:
+            title = get_episode_title_from_sto(title_element, english_title)
 
     elif "https://aniworld.to/" in episode_url:
-        title = get_episode_title_from_aniworld(soup, english_title)
+        selector = "small.episodeEnglishTitle" if english_title else "span.episodeGermanTitle"
+        title_element = _select_first_text(content, (selector,), strip=True)
+        if title_element is not None:
+            title = sanitize_episode_title(title_element)
     
     return title
@@ -1,14 +1,43 @@
+import os
 import sys
-from datetime import datetime
+import queue
+import atexit
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from datetime import datetime, timedelta
 from config import DATA_DIR
 
+class _DeferredFlushFileHandler(logging.FileHandler):
+    """FileHandler, der nicht nach jeder Zeile flusht; das übernimmt _BatchingQueueListener."""
+    def flush(self):
+        pass
+
+    def flush_buffer(self):
+        super().flush()
+
+
+class _BatchingQueueListener(QueueListener):
+    """Schreibt Zeilen gepuffert und flusht erst, wenn die Queue leer ist (ein flush pro Schub statt pro Zeile)."""
+    def handle(self, record):
+        super().handle(record)
+        if self.queue.empty():
+            for handler in self.handlers:
+                handler.flush_buffer()
+
+
 class Logger:
     def __init__(self):
         self.log_file = DATA_DIR / "last_run.txt"
         self.backup_dir = DATA_DIR / "run_logs_bak"
-        self.file_handle = None
+        self.backup_retention_days = 30
         self.original_stdout = sys.stdout
         self.original_stderr = sys.stderr
+        # Datei-I/O läuft über QueueHandler/QueueListener in einem Hintergrund-Thread
+        self._file_logger = logging.getLogger("aniloader.run")
+        self._file_logger.setLevel(logging.INFO)
+        self._file_logger.propagate = False
+        self._queue_handler = None
+        self._listener = None
         
     def start_logging(self):
         """Startet das Logging für einen neuen Run."""
@@ -21,38 +50,63 @@ class Logger:
                 self.log_file.rename(backup_file)
             except Exception as e:
                 print(f"[LOGGER-ERROR] Backup fehlgeschlagen: {e}")
+            self.cleanup_old_backups()
         
         # Neue last_run.txt öffnen
         try:
-            self.file_handle = open(self.log_file, 'w', encoding='utf-8')
+            file_handler = _DeferredFlushFileHandler(self.log_file, mode='w', encoding='utf-8')
+            file_handler.terminator = ""  # Nachrichten aus print() enthalten ihre Zeilenumbrüche bereits
+            file_handler.setFormatter(logging.Formatter("%(message)s"))
+            self._queue_handler = QueueHandler(queue.Queue())
+            self._listener = _BatchingQueueListener(self._queue_handler.queue, file_handler)
+            self._file_logger.addHandler(self._queue_handler)
+            self._listener.start()
             sys.stdout = self
             sys.stderr = self
             self.log(f"=== Run gestartet: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===")
         except Exception as e:
             print(f"[LOGGER-ERROR] Konnte Log-Datei nicht öffnen: {e}")
     
+    def cleanup_old_backups(self):
+        """Löscht Run-Log-Backups, die älter als backup_retention_days sind (ganze Dateien, kein Umschreiben)."""
+        # Der Zeitstempel im Dateinamen ist nullgefüllt, daher reicht ein String-Vergleich statt strptime
+        cutoff_stem = (datetime.now() - timedelta(days=self.backup_retention_days)).strftime("run_%Y-%m-%d_%H-%M-%S")
+        # scandir + Namensvergleich statt glob(): kein Muster-Parsing und kein Path-Objekt pro Eintrag
+        with os.scandir(self.backup_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".txt"):
+                    continue
+                stem = entry.name[:-len(".txt")]
+                if stem.startswith("run_") and len(stem) == len(cutoff_stem) and stem < cutoff_stem:
+                    try:
+                        os.unlink(entry.path)
+                    except Exception as e:
+                        print(f"[LOGGER-ERROR] Konnte altes Backup nicht löschen: {e}")
+
     def stop_logging(self):
         """Stoppt das Logging."""
-        if self.file_handle:
+        if self._listener:
             self.log(f"=== Run beendet: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} ===")
             sys.stdout = self.original_stdout
             sys.stderr = self.original_stderr
-            self.file_handle.close()
-            self.file_handle = None
+            listener = self._listener
+            self._listener = None
+            self._file_logger.removeHandler(self._queue_handler)
+            self._queue_handler = None
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
     
     def write(self, message):
-        """Schreibt in Console und Datei."""
+        """Schreibt in die Console und übergibt die Nachricht an den Datei-Logger."""
         self.original_stdout.write(message)
-        if self.file_handle:
-            self.file_handle.write(message)
-            self.file_handle.flush()
-    
+        if self._listener:
+            self._file_logger.info(message)
+
     def flush(self):
-        """Flush für stdout-Kompatibilität."""
+        """Flush für stdout-Kompatibilität (die Datei schreibt der QueueListener-Thread)."""
         self.original_stdout.flush()
-        if self.file_handle:
-            self.file_handle.flush()
-    
+
     def log(self, message):
         """Loggt eine Nachricht mit Timestamp."""
         timestamp = datetime.now().strftime("%H:%M:%S")
@@ -62,6 +116,7 @@ class Logger:
 
 
 _logger = Logger()
+atexit.register(_logger.stop_logging)
 
 def start_run_logging():
     """Startet das Logging für einen neuen Download-Run."""
@@ -2,9 +2,9 @@ import os
 import time
 from flask import Flask
 from flask_cors import CORS
-from API_Endpoints import api
+from API_Endpoints import api, cache
 from config import load_config
-from database import init_db, update_index, update_title, add_url_to_db
+from database import init_db, update_title, add_urls_to_db
 from downloader import download
 from txt_manager import read_aniloader_txt, write_to_aniloader_txt_bak
 from helper import sanitize_url
@@ -19,20 +19,16 @@ CORS(app, resources={r"/*": {
     "allow_headers": "*", 
     "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     "supports_credentials": False,
-    "expose_headers": "*"
+    "expose_headers": "*",
+    "max_age": 3600
 }})
 
+# Kurzlebiger In-Memory-Cache für die lesenden DB-Endpoints
+cache.init_app(app, config={"CACHE_TYPE": "SimpleCache", "CACHE_DEFAULT_TIMEOUT": 5})
+
 # API Blueprint registrieren
 app.register_blueprint(api)
 
-# CORS Preflight Handler
-@app.after_request
-def after_request(response):
-    response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Headers', '*')
-    response.headers.add('Access-Control-Allow-Methods', '*')
-    return response
-
 # -------------------- START --------------------
 
 
@@ -51,22 +47,17 @@ if __name__ == "__main__":
     if not PORT or REFRESH_TITLES is None or ANILOADER_TXT_BACKUP is None:
         print("Ungültige Konfiguration. Bitte überprüfen Sie die config.json.")
         exit(1)
-    update_title = bool(config.get('refresh_titles'))
 
     init_db()
-    update_index()
-    if update_title:
+    if REFRESH_TITLES:
         update_title()
 
     aniloader_txt = read_aniloader_txt(PATH_ANILOADER_TXT)
 
     if len(aniloader_txt) > 0:
         print(f"Füge {len(aniloader_txt)} Einträge aus aniloader.txt zur Datenbank hinzu...")
-        sanitize_urls = []
-        for url in aniloader_txt:
-            sanitized_url = sanitize_url(url)
-            sanitize_urls.append(sanitized_url)
-            add_url_to_db(sanitized_url)
+        sanitize_urls = [sanitize_url(url) for url in aniloader_txt]
+        add_urls_to_db(sanitize_urls)
             
         if ANILOADER_TXT_BACKUP:
             print("Creating backup of AniLoader.txt...")
@@ -19,19 +19,19 @@ def read_aniloader_txt(file_path):
 def write_to_aniloader_txt_bak(file_path, lines):
     create_aniloader_txt(file_path)
 
-    existing_lines = set()
-    if os.path.exists(file_path):
-        with open(file_path, 'r', encoding='utf-8') as file:
-            for line in file:
-                existing_lines.add(line.rstrip('\n'))
-
-
-    new_lines = [line for line in lines if line not in existing_lines]
-    all_lines = list(existing_lines) + new_lines
-
-    with open(file_path, 'w', encoding='utf-8') as file:
-        for line in all_lines:
-            file.write(f"{line}\n")
+    with open(file_path, 'r', encoding='utf-8') as file:
+        content = file.read()
+    existing_lines = set(content.split('\n'))
+
+    # Nur neue Zeilen anhängen (Reihenfolge bleibt erhalten), statt die ganze Datei neu zu schreiben
+    new_lines = [line for line in dict.fromkeys(lines) if line not in existing_lines]
+    if not new_lines:
+        return
+
+    with open(file_path, 'a', encoding='utf-8') as file:
+        if content and not content.endswith('\n'):
+            file.write('\n')
+        file.writelines(f"{line}\n" for line in new_lines)
 
 
 def clear_aniloader_txt(file_path):
@@ -1,7 +1,7 @@
 def get_season_url(url: str, staffel: str) -> str:
         if "https://s.to/" in url: 
             staffel_url = url.rstrip('/') + '/staffel-' + staffel
-        elif int(staffel) > 0 and "https://aniworld.to/" in url:
+        elif "https://aniworld.to/" in url and staffel.isdigit() and int(staffel) > 0:
             staffel_url = url.rstrip('/') + '/staffel-' + staffel
         elif staffel.strip().lower() == "filme" and "https://aniworld.to/" in url:
             staffel_url = url.rstrip('/') + '/filme'
@@ -10,16 +10,8 @@ def get_season_url(url: str, staffel: str) -> str:
         return staffel_url
 
 def get_episode_url(url: str, staffel: str, episode: str) -> str:
+        # get_season_url prüft Seite und Staffel bereits, hier nur noch die Episode anhängen
         staffel_url = get_season_url(url, staffel)
-        if "https://s.to/" in url: 
-            episode_url = staffel_url.rstrip('/') + '/episode-' + episode
-
-        elif int(staffel) > 0 and "https://aniworld.to/" in url:
-            episode_url = staffel_url.rstrip('/') + '/episode-' + episode
-
-        elif staffel.strip().lower() == "filme" and "https://aniworld.to/" in url:
-            episode_url = staffel_url.rstrip('/') + '/episode-' + episode
-            
-        else:
+        if not staffel_url:
             return ""
-        return episode_url
+        return staffel_url + '/episode-' + episode